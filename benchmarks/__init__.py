@@ -0,0 +1,2 @@
+# Benchmarks for the map-building and data-loading hot paths; run with
+# `python -m benchmarks` from the repository root.
@@ -0,0 +1,288 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# name -> (setup function, params, whether params are row counts, budget);
+# see `case`
+CASES = {}
+
+# Synthetic point frame sizes for the map benchmarks
+POINT_ROWS = (10, 1_000, 100_000, 1_000_000)
+UPLOAD_ROWS = (1_000, 100_000)
+# How much longer than its unavoidable dependencies a fresh interpreter may
+# take to import the app; every new server replica pays this before it can
+# render anything. Relative, since the absolute time depends on the machine.
+IMPORT_BUDGET_RATIO = 1.5
+IMPORT_BASELINE = "import streamlit, folium, geopandas"
+
+# Coordinates the stubbed geocoder answers with
+CAPITALS = {
+    "london": (51.5073, -0.1277),
+    "paris": (48.8535, 2.3484),
+    "madrid": (40.4167, -3.7036),
+    "berlin": (52.5170, 13.3889),
+    "rome": (41.8933, 12.4829),
+    "athens": (37.9839, 23.7283),
+    "vienna": (48.2084, 16.3725),
+    "amsterdam": (52.3731, 4.8925),
+}
+
+
+def case(name, params=(None,), rows=False, budget=None):
+    """Register a benchmark.
+
+    The decorated function does the untimed setup for one param and returns
+    the timed callable (or None to skip the param); whatever that returns
+    (str or bytes) is reported as the output size. rows marks params that
+    are row counts, which --max-rows can cap. A case whose fastest run takes
+    longer than budget seconds fails the benchmark run; budget may also be a
+    function measuring the seconds on this machine, called after setup.
+    """
+
+    def register(setup):
+        CASES[name] = (setup, params, rows, budget)
+        return setup
+
+    return register
+
+
+def stub_network():
+    """Answer Nominatim lookups from CAPITALS instead of the network."""
+    from map_stream import geocoding
+
+    def nominatim_search(query, **params):
+        lat, lon = CAPITALS.get(geocoding.normalize_query(query), (50.0, 10.0))
+        result = {"lat": str(lat), "lon": str(lon)}
+        if params.get("polygon_geojson"):
+            result["geojson"] = {
+                "type": "Polygon",
+                "coordinates": [[[lon - 0.1, lat - 0.1], [lon + 0.1, lat - 0.1], [lon + 0.1, lat + 0.1], [lon - 0.1, lat + 0.1], [lon - 0.1, lat - 0.1]]],
+            }
+        return [result]
+
+    geocoding.nominatim_search = nominatim_search
+
+
+def synthetic_points(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    cities = np.array(["London", "Paris", "Rome", "Vienna", "Berlin"])
+    return pd.DataFrame(
+        {
+            "City": cities[rng.integers(0, len(cities), rows)],
+            "Population": rng.integers(1_000, 10_000_000, rows),
+            "Latitude": rng.uniform(36, 60, rows),
+            "Longitude": rng.uniform(-10, 30, rows),
+        }
+    )
+
+
+def capitals():
+    return pd.DataFrame(
+        {
+            "City": [name.title() for name in CAPITALS],
+            "Population": [8_982_000, 2_148_000, 3_223_000, 3_645_000, 2_873_000, 664_046, 1_897_000, 821_752],
+            "Latitude": [lat for lat, _ in CAPITALS.values()],
+            "Longitude": [lon for _, lon in CAPITALS.values()],
+        }
+    )
+
+
+@case("load_shapefile", params=(0, 1, 2, 3))
+def load_shapefile(level):
+    import geopandas as gpd
+
+    from map_stream.boundaries import boundary_path
+
+    return lambda: gpd.read_file(boundary_path(level))
+
+
+@case("load_geoparquet", params=(0, 1, 2, 3))
+def load_geoparquet(level):
+    from map_stream.boundaries import parquet_path
+    from map_stream.parquet import read_geoparquet
+
+    if not os.path.exists(parquet_path(level)):
+        return None
+    return lambda: read_geoparquet(parquet_path(level))
+
+
+@case("to_crs", params=(0, 1, 2, 3))
+def to_crs(level):
+    import geopandas as gpd
+
+    from map_stream.boundaries import boundary_path
+
+    gdf = gpd.read_file(boundary_path(level))
+    return lambda: gdf.to_crs("EPSG:3857")
+
+
+def _render_layer(layer):
+    import folium
+
+    from map_stream.basemap import render_map
+
+    m = folium.Map(location=[51.1657, 10.4515], zoom_start=6)
+    layer.add_to(m)
+    return render_map(m)
+
+
+@case("geojson_layer_full", params=(1, 2, 3))
+def geojson_layer_full(level):
+    from map_stream.boundaries import get_boundaries
+    from map_stream.layers import geojson_layer
+
+    gdf = get_boundaries(level)
+    # handle_geojson_data's path for data without a prebuilt GeoJSON
+    return lambda: _render_layer(geojson_layer(gdf, gdf.to_crs("EPSG:4326")))
+
+
+@case("geojson_layer_simplified", params=(1, 2, 3))
+def geojson_layer_simplified(level):
+    from map_stream.basemap import ZOOM_START
+    from map_stream.boundaries import get_boundaries
+    from map_stream.layers import geojson_layer
+    from map_stream.simplify import get_simplified_geojson
+
+    gdf = get_boundaries(level)
+    data = get_simplified_geojson(level, ZOOM_START)
+    return lambda: _render_layer(geojson_layer(gdf, data))
+
+
+@case("display_map", params=POINT_ROWS, rows=True)
+def display_map(rows):
+    from map_stream.basemap import display_map, render_map
+
+    df = synthetic_points(rows)
+    return lambda: render_map(display_map(df))
+
+
+def _write_upload(rows, driver, suffix, directory):
+    import geopandas as gpd
+    import shapely
+
+    df = synthetic_points(rows)
+    points = shapely.points(df["Longitude"], df["Latitude"])
+    gdf = gpd.GeoDataFrame(df, geometry=shapely.buffer(points, 0.01, quad_segs=4), crs="EPSG:4326")
+    path = os.path.join(directory, f"upload{suffix}")
+    gdf.to_file(path, driver=driver)
+    return [os.path.join(directory, name) for name in os.listdir(directory)]
+
+
+def _upload_case(rows, driver, suffix):
+    from map_stream.ingest import read_batched
+    from map_stream.simplify import to_compact_geojson
+
+    directory = tempfile.mkdtemp(prefix="map_stream_bench_")
+    paths = _write_upload(rows, driver, suffix, directory)
+    # handle_upload on a cache miss: batched read, then the GeoJSON sent
+    return lambda: to_compact_geojson(read_batched(paths))
+
+
+@case("upload_shapefile", params=UPLOAD_ROWS, rows=True)
+def upload_shapefile(rows):
+    return _upload_case(rows, "ESRI Shapefile", ".shp")
+
+
+@case("upload_geojson", params=UPLOAD_ROWS, rows=True)
+def upload_geojson(rows):
+    return _upload_case(rows, "GeoJSON", ".geojson")
+
+
+@case("upload_workers", params=UPLOAD_ROWS, rows=True)
+def upload_workers(rows):
+    from itertools import count
+
+    from map_stream.ingest import plan_shards
+    from map_stream.workers import GeometryService
+
+    directory = tempfile.mkdtemp(prefix="map_stream_bench_")
+    paths = _write_upload(rows, "ESRI Shapefile", ".shp", directory)
+    service = GeometryService()
+    # start the workers outside the timed runs, as a long-running server has
+    service.submit("warm-up", plan_shards(paths)).result()
+    keys = count()
+    # handle_upload on a cache miss worth offloading
+    return lambda: service.submit(next(keys), plan_shards(paths)).result()[1]
+
+
+@case("full_page_render", params=("base", "adm2", "adm3"))
+def full_page_render(layer):
+    from map_stream.basemap import ZOOM_START, compose_map, render_map
+    from map_stream.boundaries import get_boundaries
+    from map_stream.layers import geojson_layer
+    from map_stream.simplify import get_simplified_geojson
+
+    df = capitals()
+
+    def run():
+        layers = []
+        if layer != "base":
+            level = int(layer[-1])
+            layers.append(geojson_layer(get_boundaries(level), get_simplified_geojson(level, ZOOM_START)))
+        return render_map(compose_map(df, layers))
+
+    return run
+
+
+@case("layer_manager_rerun", params=(1, 5, 10))
+def layer_manager_rerun(count):
+    from map_stream.basemap import ZOOM_START, compose_map, render_map
+    from map_stream.boundaries import get_boundaries
+    from map_stream.layer_manager import LayerManager
+    from map_stream.layers import geojson_layer
+    from map_stream.simplify import get_simplified_geojson
+
+    df = capitals()
+    levels = [1 + i % 3 for i in range(count)]
+    manager = LayerManager()
+
+    def run():
+        # a rerun that shows the same layers as the one before
+        manager.begin()
+        layers = [
+            manager.layer(i, lambda level=level: geojson_layer(get_boundaries(level), get_simplified_geojson(level, ZOOM_START)))
+            for i, level in enumerate(levels)
+        ]
+        manager.end()
+        return render_map(compose_map(df, layers))
+
+    run()
+    return run
+
+
+def _import_seconds(code, repeat=3):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # a new interpreter each time, so nothing is imported yet
+    command = [sys.executable, "-c", code]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=root, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def import_budget():
+    """IMPORT_BUDGET_RATIO times the import of IMPORT_BASELINE, in seconds."""
+    return IMPORT_BUDGET_RATIO * _import_seconds(IMPORT_BASELINE)
+
+
+@case("import_app", budget=import_budget)
+def import_app(_):
+    return lambda: _import_seconds("import map_stream.app", repeat=1)
+
+
+@case("app_rerun", params=("cold", "warm"))
+def app_rerun(mode):
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "as1.py")
+    app = AppTest.from_file(script, default_timeout=300)
+    if mode == "warm":
+        app.run()
+    return lambda: app.run()
@@ -0,0 +1,222 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from benchmarks.runner import ROOT, _peak_rss_mb, _reset_peak_rss, _rss_mb
+
+# Load test of the dashboard: N simulated sessions drive as1.py through
+# Streamlit's AppTest, all in one process the way browser tabs share one
+# server process, so they share its caches and compete for its CPU. Each
+# concurrency level runs in a fresh process:
+#
+#   python -m benchmarks.load [--sessions 1 4 16] [--actions 20] [--json out.json]
+
+SCRIPT = os.path.join(ROOT, "as1.py")
+# How often a simulated user does what; "rerun" is a rerun without input,
+# like a widget elsewhere on the page changing
+ACTIONS = {"rerun": 3, "boundary": 2, "heatmap": 2, "search": 2, "upload": 1}
+# Features of the generated uploads; below the geometry workers' threshold,
+# so uploads are read in the session like small real ones
+UPLOAD_ROWS = (1_000, 5_000)
+PERCENTILES = (50, 90, 99)
+
+
+class _Upload(io.BytesIO):
+    # the parts of Streamlit's UploadedFile the app reads
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.file_id = path
+
+
+def _patch_uploads(uploads):
+    """Make the app's upload widget return the files a session picked.
+
+    AppTest can't upload files, so a session sets
+    session_state["load_test_upload"] to a key of uploads instead.
+    """
+    import streamlit as st
+    from streamlit.delta_generator import DeltaGenerator
+
+    file_uploader = DeltaGenerator.file_uploader
+
+    def patched(self, label, *args, **kwargs):
+        if kwargs.get("key") == "upload":
+            picked = st.session_state.get("load_test_upload")
+            return [_Upload(path) for path in uploads[picked]] if picked else []
+        return file_uploader(self, label, *args, **kwargs)
+
+    DeltaGenerator.file_uploader = patched
+
+
+def _write_uploads(directory):
+    from benchmarks.cases import _write_upload
+
+    uploads = {}
+    for rows in UPLOAD_ROWS:
+        path = os.path.join(directory, f"upload_{rows}")
+        os.makedirs(path)
+        uploads[rows] = _write_upload(rows, "ESRI Shapefile", ".shp", path)
+    return uploads
+
+
+def _place_names():
+    from benchmarks.cases import CAPITALS
+    from map_stream.boundaries import get_boundaries
+
+    # DEU names resolve from the gazetteer, the capitals from the stub
+    return [name.title() for name in CAPITALS] + sorted(get_boundaries(2, ["NAME_2"])["NAME_2"])[:20]
+
+
+class Session:
+    """One simulated user: an AppTest and the time each of its reruns took."""
+
+    def __init__(self, seed, uploads, places, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(SCRIPT, default_timeout=timeout)
+        self.rng = random.Random(seed)
+        self.uploads = uploads
+        self.places = places
+        # (action, seconds, failed)
+        self.records = []
+
+    def _widget(self, kind, label):
+        return next(w for w in getattr(self.app, kind) if w.label == label)
+
+    def act(self, action):
+        if action == "boundary":
+            self._widget("button", self.rng.choice(["DEU_Level2", "DEU_Level3"])).click()
+        elif action == "heatmap":
+            checkbox = self._widget("checkbox", "Show Heatmap")
+            checkbox.set_value(not checkbox.value)
+        elif action == "search":
+            names = self.rng.sample(self.places, self.rng.randint(1, 3))
+            self.app.text_input[0].set_value(", ".join(names))
+        elif action == "upload":
+            self.app.session_state["load_test_upload"] = self.rng.choice(list(self.uploads))
+        start = time.perf_counter()
+        self.app.run()
+        self.records.append((action, time.perf_counter() - start, bool(self.app.exception)))
+
+    def run(self, actions):
+        self.act("open")
+        names, weights = zip(*ACTIONS.items())
+        for action in self.rng.choices(names, weights, k=actions):
+            self.act(action)
+        return self.records
+
+
+def _percentiles(seconds):
+    if len(seconds) < 2:
+        return {f"p{p}_s": seconds[0] for p in PERCENTILES}
+    cuts = statistics.quantiles(seconds, n=100, method="inclusive")
+    return {f"p{p}_s": cuts[p - 1] for p in PERCENTILES}
+
+
+def run_level(sessions, actions, seed, timeout):
+    """Run sessions concurrent users in this (fresh) process; return the record."""
+    sys.path.insert(0, ROOT)
+    from benchmarks.cases import stub_network
+
+    stub_network()
+    uploads = _write_uploads(tempfile.mkdtemp())
+    _patch_uploads(uploads)
+    places = _place_names()
+
+    rss_before = _rss_mb()
+    _reset_peak_rss()
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(sessions, thread_name_prefix="session") as pool:
+        users = [Session(seed + i, uploads, places, timeout) for i in range(sessions)]
+        records = [r for result in pool.map(lambda user: user.run(actions), users) for r in result]
+    elapsed = time.perf_counter() - start
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    rss_after = _rss_mb()
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+
+    by_action = {}
+    for action, seconds, _ in records:
+        by_action.setdefault(action, []).append(seconds)
+    latencies = [seconds for _, seconds, _ in records]
+    return {
+        "sessions": sessions,
+        "reruns": len(records),
+        "errors": sum(failed for *_, failed in records),
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(records) / elapsed,
+        **_percentiles(latencies),
+        "cpu_s": cpu,
+        "cpu_util": cpu / elapsed,
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_per_session_mb": (rss_after - rss_before) / sessions,
+        "peak_rss_mb": _peak_rss_mb(),
+        "actions": {
+            action: {"count": len(seconds), **_percentiles(seconds)} for action, seconds in sorted(by_action.items())
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load",
+        description="Simulate concurrent dashboard sessions and measure rerun latency, CPU and memory",
+    )
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="concurrency levels to run")
+    parser.add_argument("--actions", type=int, default=20, help="interactions per session after opening the page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds a single rerun may take")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    # as in `python -m benchmarks`: caches and exports go to a scratch
+    # directory, and the stubbed Nominatim keeps the network out
+    scratch = tempfile.mkdtemp(prefix="map_stream_load_")
+    os.environ["MAPSTREAM_CACHE_DIR"] = os.path.join(scratch, "cache")
+    os.environ["MAPSTREAM_EXPORT_DIR"] = os.path.join(scratch, "exports")
+    os.environ["TMPDIR"] = scratch
+    context = multiprocessing.get_context("spawn")
+
+    results = []
+    print(
+        f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'rerun/s':>8} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} "
+        f"{'cpu %':>6} {'RSS MB':>8} {'MB/session':>10}"
+    )
+    try:
+        for sessions in args.sessions:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                record = pool.submit(run_level, sessions, args.actions, args.seed, args.timeout).result()
+            results.append(record)
+            print(
+                f"{sessions:8} {record['reruns']:7} {record['errors']:6} {record['throughput_per_s']:8.2f} "
+                f"{record['p50_s']:7.3f} {record['p90_s']:7.3f} {record['p99_s']:7.3f} "
+                f"{record['cpu_util'] * 100:6.0f} {record['rss_after_mb']:8.1f} {record['rss_per_session_mb']:10.1f}",
+                flush=True,
+            )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for record in results:
+        print(f"\n{record['sessions']} sessions, per action:")
+        for action, stats in record["actions"].items():
+            print(f"  {action:10} {stats['count']:5} {stats['p50_s']:7.3f} {stats['p90_s']:7.3f} {stats['p99_s']:7.3f}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rss_mb():
+    # current resident set size, Linux only
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return None
+
+
+def _reset_peak_rss():
+    # Linux: restart the high-water mark, so the peak only covers what runs
+    # after this (not e.g. a benchmark's setup)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    # peak resident set size since _reset_peak_rss on Linux; elsewhere the
+    # process's lifetime peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1e3
+    except (OSError, ValueError):
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def run_case(name, param, repeat):
+    """Run one benchmark in this (fresh) process and return its record."""
+    sys.path.insert(0, ROOT)
+    from benchmarks.cases import CASES, stub_network
+
+    stub_network()
+    setup, _, _, budget = CASES[name]
+    run = setup(param)
+    if run is None:
+        return None
+    if callable(budget):
+        budget = budget()
+    rss_before = _rss_mb()
+    _reset_peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = run()
+        times.append(time.perf_counter() - start)
+    peak = _peak_rss_mb()
+    size = None
+    if isinstance(output, str):
+        size = len(output.encode("utf-8"))
+    elif isinstance(output, bytes):
+        size = len(output)
+    return {
+        "case": name,
+        "param": param,
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak,
+        # memory the timed runs added on top of the setup
+        "peak_increase_mb": None if rss_before is None else max(0.0, peak - rss_before),
+        "output_bytes": size,
+        "budget_s": budget,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time the map-building and data-loading hot paths",
+    )
+    parser.add_argument("-k", dest="pattern", help="only run cases whose id contains this")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-rows", type=int, help="skip row-count params above this")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    # keep the geocode cache and the exports of the app benchmark out of
+    # the working tree; each case then runs in its own process
+    scratch = tempfile.mkdtemp(prefix="map_stream_bench_")
+    os.environ["MAPSTREAM_CACHE_DIR"] = os.path.join(scratch, "cache")
+    os.environ["MAPSTREAM_EXPORT_DIR"] = os.path.join(scratch, "exports")
+    os.environ["TMPDIR"] = scratch
+    context = multiprocessing.get_context("spawn")
+
+    results = []
+    try:
+        _run_all(args, context, results)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    over = [r for r in results if r["budget_s"] is not None and r["min_s"] > r["budget_s"]]
+    if over:
+        sys.exit(f"over budget: {', '.join(r['case'] for r in over)}")
+
+
+def _run_all(args, context, results):
+    from benchmarks.cases import CASES
+
+    print(f"{'case':40} {'min s':>9} {'median s':>9} {'peak MB':>9} {'+MB':>9} {'output kB':>10}")
+    for name, (_, params, rows, _) in CASES.items():
+        for param in params:
+            case_id = name if param is None else f"{name}[{param}]"
+            if args.pattern and args.pattern not in case_id:
+                continue
+            if rows and args.max_rows and param > args.max_rows:
+                continue
+            repeat = 1 if name == "app_rerun" and param == "cold" else args.repeat
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                record = pool.submit(run_case, name, param, repeat).result()
+            if record is None:
+                print(f"{case_id:40} skipped")
+                continue
+            results.append(record)
+            size = "" if record["output_bytes"] is None else f"{record['output_bytes'] / 1e3:10.1f}"
+            increase = "" if record["peak_increase_mb"] is None else f"{record['peak_increase_mb']:9.1f}"
+            budget = record["budget_s"]
+            over = budget is not None and record["min_s"] > budget
+            print(
+                f"{case_id:40} {record['min_s']:9.3f} {record['median_s']:9.3f} "
+                f"{record['peak_rss_mb']:9.1f} {increase:>9} {size:>10}"
+                + (f"  over budget ({budget:.2f} s)" if over else ""),
+                flush=True,
+            )
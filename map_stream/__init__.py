@@ -0,0 +1 @@
+# Helpers shared by the Streamlit dashboard (as1.py) and its offline tools.
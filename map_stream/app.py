@@ -0,0 +1,557 @@
+import shutil
+import tempfile
+
+import folium
+import geopandas as gpd
+import pandas as pd
+import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from map_stream.basemap import ZOOM_START, compose_map, get_base_html, render_map
+from map_stream.boundaries import boundary_source, get_boundaries
+from map_stream.export import export_session, publish
+from map_stream.join import JOIN_LEVELS, aggregate_points, choropleth_geojson, choropleth_style
+from map_stream.layer_manager import get_layer_manager, source_hash
+from map_stream.layers import bounds_from_folium, geojson_layer, get_layer_store, layer_key
+from map_stream.simplify import get_simplified_geojson, to_compact_geojson
+from map_stream.telemetry import (
+    RerunMetrics,
+    profile_report,
+    start_metrics_server,
+    start_profile,
+)
+from map_stream.warmup import warm_up
+
+# The dashboard. Importing this module has no side effects; Streamlit runs
+# main() on every rerun through the as1.py entry point. Subsystems only some
+# sessions use (vector tiles, uploads, place search, heatmap, st_folium) are
+# imported where they are used, and warm_up() preloads them off the main path.
+
+# Seconds between checks on an upload the geometry workers are reading
+UPLOAD_POLL_SECONDS = 1.0
+
+
+@st.cache_data
+def europe_capital():
+    # Sample data for the capital cities of Europe
+    data = {
+        "City": [
+            "London",
+            "Paris",
+            "Madrid",
+            "Berlin",
+            "Rome",
+            "Athens",
+            "Vienna",
+            "Amsterdam",
+        ],
+        "Population": [
+            8961989,
+            2140526,
+            3266126,
+            3769495,
+            2872800,
+            6640466,
+            1911191,
+            873555,
+        ],
+        # Fixed coordinates (as Nominatim returns them), so a cold start
+        # doesn't wait on eight rate-limited geocoding requests
+        "Latitude": [51.5073, 48.8535, 40.4167, 52.5170, 41.8933, 37.9839, 48.2084, 52.3731],
+        "Longitude": [-0.1277, 2.3484, -3.7036, 13.3889, 12.4829, 23.7283, 16.3725, 4.8925],
+    }
+
+    df = pd.DataFrame(data).dropna()
+    return df
+
+
+@st.fragment(run_every=UPLOAD_POLL_SECONDS)
+def upload_job_status(job, workers):
+    # reruns on its own while the geometry workers read an upload, and reruns
+    # the whole app once they are done so the layer is drawn
+    if job.done():
+        st.rerun()
+    done, total = job.progress()
+    reading = ", still reading" if job.reading else ""
+    st.progress(
+        done / total if total else 0.0,
+        text=f"Processing upload on {workers} workers: {done} of {total} parts{reading}, {job.elapsed():.0f}s",
+    )
+
+
+def main():
+    # Streamlit configuration
+    st.set_page_config(page_title="Dashboard with Folium Map and Plots", layout="wide")
+
+    # Load the shared boundary data and import the optional subsystems in the
+    # background while this first run renders the page
+    warm_up()
+
+    # Per-rerun stage timings and payload sizes; the debug panel in the sidebar
+    # shows them and can profile this session's reruns
+    ctx = get_script_run_ctx()
+    metrics = RerunMetrics(ctx.session_id if ctx else "default")
+    profile = start_profile() if st.session_state.get("profile_reruns") else None
+    start_metrics_server()
+
+    with metrics.span("data_load"):
+        df = europe_capital()
+
+    # Title and subtitle
+    st.title("Full-Page Dashboard with Folium Map and Plots")
+    st.subheader("Interactive map and plot options")
+
+    # Wide layout with two columns
+    col1, col2 = st.columns([2, 0.1])
+
+    # # Column 1 - Maps and Plots
+    # with col2:
+    #     # Plot options
+    #     st.subheader("Plot Options")
+    #     selected_plot = st.selectbox(
+    #         "Select a plot:", ["Bar Plot", "Pie Chart", "Scatter Plot"]
+    #     )
+
+    #     if selected_plot == "Bar Plot":
+    #         st.subheader("Bar Plot")
+    #         fig, ax = plt.subplots(figsize=(8, 6))
+    #         sns.barplot(x="City", y="Population", data=df, ax=ax)
+    #         plt.xlabel("City")
+    #         plt.ylabel("Population")
+    #         plt.title("Population by City")
+    #         st.pyplot(fig)
+
+    #     elif selected_plot == "Pie Chart":
+    #         st.subheader("Pie Chart")
+    #         fig, ax = plt.subplots(figsize=(8, 6))
+    #         ax.pie(df["Population"], labels=df["City"], autopct="%1.1f%%")
+    #         plt.title("Population Distribution")
+    #         st.pyplot(fig)
+
+    #     elif selected_plot == "Scatter Plot":
+    #         st.subheader("Scatter Plot")
+    #         fig, ax = plt.subplots(figsize=(8, 6))
+    #         sns.scatterplot(x="Longitude", y="Latitude", size="Population", data=df, ax=ax)
+    #         plt.xlabel("Longitude")
+    #         plt.ylabel("Latitude")
+    #         plt.title("Population Distribution on Map")
+    #         st.pyplot(fig)
+
+    # Checkbox for Folium Heatmap
+
+    # Column 2 - Dropdown and Options
+    with col1:
+        # Folium Map
+        # st.subheader("Folium Map")
+
+        # The static base map (tiles, plugins, capital markers) is built once and
+        # cached; the layers this session adds are collected in `layers` and
+        # composed onto a copy of it once the whole page has been processed.
+        # Layers shown the rerun before come back from the session's layer
+        # manager already rendered; only new or changed ones are built.
+        layers = []
+        layer_manager = get_layer_manager()
+        layer_manager.begin()
+        metrics.begin("layers")
+
+        # Serve large layers from the local vector tile server instead of inlining
+        # every feature into the page
+        vector_tiles = st.sidebar.checkbox(
+            "Serve layers as vector tiles",
+            help="Only the tiles in view are sent to the browser; needs mapbox-vector-tile",
+        )
+
+        # Re-send only the features inside the current map view. The view comes
+        # back from st_folium, so in this mode the map is embedded with st_folium
+        # and the layers persist across reruns until the mode is switched off.
+        clip_to_view = st.sidebar.checkbox("Only send features in view")
+        if not clip_to_view:
+            st.session_state.pop("view_layers", None)
+        view_layers = st.session_state.setdefault("view_layers", [])
+        # layers of this run the drawn-shape query can search, besides the
+        # capitals and the DEU boundaries: name -> (layer id, GeoDataFrame)
+        query_layers = {}
+
+        # add the geojson data to the folium map; `data` optionally replaces the
+        # full geometries with a prebuilt (e.g. simplified) GeoJSON string.
+        # `source` identifies the data (a hash of data by default) and `style`
+        # the style_function, so an unchanged layer isn't built, registered
+        # or hashed again
+        def handle_geojson_data(gdf, data=None, name="layer", style_function=None, source=None, style=None):
+            if source is None:
+                source = source_hash(data) if isinstance(data, str) else layer_key(gdf)
+
+            # vector tiles get one fixed style, so styled layers (e.g. the
+            # per-unit choropleth) stay GeoJSON
+            if vector_tiles and style_function is None:
+                from map_stream.tiles import vector_tile_layer
+
+                layers.append(vector_tile_layer(gdf, name, source=source))
+                return
+
+            if clip_to_view:
+                layer_id = f"{name}:{source}"
+                get_layer_store().add(layer_id, gdf)
+                if layer_id not in view_layers:
+                    view_layers.append(layer_id)
+                return
+
+            if data is None:
+                if gdf.crs is None:
+                    gdf.crs = "EPSG:4326"
+                # Convert the shapefile to GeoJSON format
+                data = gdf = gdf.to_crs("EPSG:4326")
+
+            layers.append(
+                layer_manager.layer(("geojson", name, source, style), lambda: geojson_layer(gdf, data, style_function))
+            )
+
+        st.markdown("View Boundaries data")
+
+        a1,a2,a3 = st.columns([1,1,9])
+        with a1:
+            bt1 = st.button("DEU_Level2",type="primary")
+            if bt1:
+                handle_geojson_data(
+                    get_boundaries(2), get_simplified_geojson(2, ZOOM_START), "DEU_adm2", source=boundary_source(2)
+                )
+
+        with a2:
+            bt2 = st.button("DEU_Level3",type="primary")
+            if bt2:
+                handle_geojson_data(
+                    get_boundaries(3), get_simplified_geojson(3, ZOOM_START), "DEU_adm3", source=boundary_source(3)
+                )
+            st.write(" ")
+
+        join_level = st.selectbox(
+            "Count capitals per admin unit",
+            (None,) + JOIN_LEVELS,
+            format_func=lambda level: "Off" if level is None else f"DEU_adm{level}",
+        )
+        if join_level:
+            with metrics.span("join"):
+                counts = aggregate_points(df, join_level, weight="Population")
+            handle_geojson_data(
+                counts,
+                choropleth_geojson(counts, join_level, ZOOM_START),
+                f"DEU_adm{join_level}_points",
+                style_function=choropleth_style(counts, "points"),
+                style="points",
+            )
+
+        # search the boundaries of one or more places, bundled DEU boundaries
+        # first and Nominatim only for places they don't cover
+        city_name = st.text_input("Enter the place name (separate several with commas)")
+        places_file = st.file_uploader("Or upload a CSV of place names", type=["csv"])
+        if city_name or places_file is not None:
+            from map_stream.search import MAX_PLACES, places_from_csv, search_places, split_places, unique_places
+
+            places = split_places(city_name)
+            if places_file is not None:
+                places += places_from_csv(places_file)
+        else:
+            places = []
+        if places:
+            with st.spinner(f"Searching {len(places)} place(s)"), metrics.span("geocode"):
+                found, missing = search_places(places)
+            if len(found):
+                # keyed on the names found, which grow as lookups that missed
+                # the deadline finish in the background; a name's geometry is
+                # fixed by the gazetteer or the geocode cache
+                layers.append(
+                    layer_manager.layer(
+                        ("search", *found["query"]),
+                        lambda: folium.GeoJson(found, name="Search", tooltip=folium.GeoJsonTooltip(["query"])),
+                    )
+                )
+            if len(unique_places(places)) > MAX_PLACES:
+                st.warning(f"Only the first {MAX_PLACES:,} places are searched; the rest are listed below")
+            if missing:
+                st.warning("No boundary found for: " + ", ".join(missing))
+
+        # st.subheader("Folium Heatmap")
+        # Add checkbox for folium heatmap
+        show_heatmap = st.checkbox("Show Heatmap")
+        if show_heatmap:
+            from map_stream.heatmap import BIN_METHODS, heatmap_layer
+
+            heatmap_bins = st.sidebar.radio("Heatmap binning", BIN_METHODS, horizontal=True)
+            layers.append(
+                layer_manager.layer(
+                    ("heatmap", heatmap_bins),
+                    lambda: heatmap_layer(df, weight="Population", method=heatmap_bins),
+                )
+            )
+
+        # st.subheader("OpenSeaMap")
+        # show_openseamap = st.checkbox("Show Openseamap")
+        # if show_openseamap:
+        #     folium.TileLayer('http://tiles.openseamap.org/seamark/{z}/{x}/{y}.png',
+        #                  name='OpenSeaMap',
+        #                  attr='Map data © OpenSeaMap contributors').add_to(m)
+        # Shapefile/GeoJSON Upload
+
+        # st.subheader("Upload Shapefile or GeoJSON")
+        # uploaded_file = st.file_uploader(
+        #     "Upload a Shapefile or GeoJSON file", type=["shp", "geojson"]
+        # )
+
+        # if uploaded_file is not None:
+        #     try:
+        #         # Load the uploaded file using geopandas
+        #         gdf = gpd.read_file(uploaded_file)
+
+        #         # for i,v in gdf.iterrows():
+
+        #         #     tooltip = "<br>".join([f"{col}: {v[col]}" for col in gdf.columns if col != 'geometry'])
+        #         #     marker = folium.Marker(
+        #         #         location=[v.geometry.centroid.y, v.geometry.centroid.x],
+        #         #         tooltip=tooltip
+        #         #     )
+        #         #     #marker = folium.Marker(location=[v.geometry.centroid.y, v.geometry.centroid.x], tooltip=f"{v.STATE_CODE},<br>{v.GaPa_NaPa},<br>{v.DISTRICT}")
+        #         #     marker.add_to(m)
+        #         # Add the loaded shapefile/GeoJSON to the map
+        #         def highlight_function(feature):
+        #             return {
+        #                 "fillColor": "#ff0000",
+        #                 "color": "#000000",
+        #                 "weight": 1,
+        #                 "fillOpacity": 0.5,
+        #             }
+
+        #         jsond = folium.GeoJson(gdf, highlight_function=highlight_function).add_to(m)
+        #         folium.GeoJsonPopup(
+        #             fields=[col for col in gdf.columns if col != "geometry"]
+        #         ).add_to(jsond)
+        #         folium.GeoJsonTooltip(
+        #             fields=[col for col in gdf.columns if col != "geometry"],
+        #             style=(
+        #                 """background-color: grey; color: white; font-family:"
+        #      courier new; font-size: 24px; padding: 10px;"""
+        #             ),aliases=['State Number:','District:','local unit:','local unit type:','Province:']
+        #         ).add_to(jsond)
+
+        #     except Exception as e:
+        #         st.error(
+        #             "Error loading file. Please make sure it is a valid Shapefile or GeoJSON."
+        #         )
+
+        @st.cache_data
+        def get_temp_dir():
+            return tempfile.TemporaryDirectory().name
+
+        tempdir = get_temp_dir()
+
+        # handle the uploaded file in folium map; every uploaded dataset (a .shp
+        # with its sidecar parts, or one or more GeoJSON files) is read in bounded
+        # batches and merged into one layer
+        def handle_upload(uploaded_file):
+            from map_stream.ingest import DATASET_SUFFIXES, plan_shards, read_batched, save_uploads
+            from map_stream.upload_cache import get_upload_cache, upload_digest
+            from map_stream.workers import get_geometry_service, worth_offloading
+
+            files = uploaded_file if type(uploaded_file) == list else [uploaded_file]
+            if not any(file.name.endswith(DATASET_SUFFIXES) for file in files):
+                return
+
+            # Reruns see the same uploads again: hash each set of files once per
+            # session and serve the parsed layer from the upload cache
+            file_ids = tuple(getattr(file, "file_id", None) or file.name for file in files)
+            digests = st.session_state.setdefault("upload_digests", {})
+            if file_ids not in digests:
+                digests[file_ids] = upload_digest(files)
+            digest = digests[file_ids]
+            upload_cache = get_upload_cache()
+            cached = upload_cache.get(digest)
+
+            if cached is None:
+                service = get_geometry_service()
+                job = service.get(digest) if service else None
+                if job is None:
+                    # Save the uploaded files to a temporary directory
+                    directory = tempfile.mkdtemp(prefix="map_stream_upload_")
+                    paths = save_uploads(files, directory)
+                    shards = plan_shards(paths)
+                    if service is not None and worth_offloading(shards):
+                        # large uploads are processed part by part on the geometry
+                        # workers; the session shows the job instead of blocking
+                        job = service.submit(digest, shards, directory)
+                    else:
+                        progress = st.sidebar.progress(0.0, text="Reading upload")
+
+                        def report(done, total):
+                            progress.progress(done / total, text=f"Read {done:,} of {total:,} features")
+
+                        try:
+                            with metrics.span("upload"):
+                                gdf = read_batched(paths, progress=report)
+                        finally:
+                            shutil.rmtree(directory, ignore_errors=True)
+                        progress.empty()
+                        if gdf is None:
+                            return
+                        cached = upload_cache.put(digest, gdf, to_compact_geojson(gdf))
+
+                if job is not None:
+                    if not job.done():
+                        with st.sidebar:
+                            upload_job_status(job, service.workers)
+                        return
+                    try:
+                        with metrics.span("upload"):
+                            result = job.result()
+                    except Exception as e:
+                        st.sidebar.error(f"Error reading the upload: {e}")
+                        result = None
+                    if result is not None:
+                        cached = upload_cache.put(digest, *result)
+                    service.forget(digest)
+                    if cached is None:
+                        return
+
+            gdf, geojson = cached
+            query_layers["Upload"] = (f"upload:{digest}", gdf)
+            handle_geojson_data(gdf, geojson, name="upload", source=digest)
+
+        # Add the file upload button to the Streamlit app
+        st.sidebar.header("Upload Shapefile or GeoJSON")
+        uploaded_file = st.sidebar.file_uploader(
+            "Upload",
+            type=["geojson", "shx", "prj", "dbf", "shp", "json"],
+            accept_multiple_files=True,
+            key="upload",
+        )
+        if uploaded_file is not None:
+            handle_upload(uploaded_file)
+
+        # Query a layer with the shapes drawn on the map. st_folium sends the
+        # drawings back after every edit; the result is drawn into its own
+        # feature group, so the map and the drawings on it stay in place
+        draw_query = st.sidebar.checkbox("Query drawn shapes", help="Draw on the map, then pick a layer to search")
+        if draw_query:
+            from map_stream.query import BUFFER_METRES, QUERY_OPS, QUERY_PHRASES, DrawQuery, drawn_shapes, result_layer, summarize
+
+            with metrics.span("query"):
+                query_target = st.sidebar.selectbox(
+                    "Layer to query", ["Capitals", *(f"DEU_adm{level}" for level in JOIN_LEVELS), *query_layers]
+                )
+                query_op = st.sidebar.radio("Features that", QUERY_OPS, horizontal=True)
+                query_metres = BUFFER_METRES
+                if query_op == "buffer":
+                    query_metres = st.sidebar.number_input("Distance (m)", min_value=0, value=BUFFER_METRES, step=100)
+
+                layer_store = get_layer_store()
+                if query_target == "Capitals":
+                    query_id = "capitals"
+                    if query_id not in layer_store:
+                        layer_store.add(
+                            query_id,
+                            gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df["Longitude"], df["Latitude"]), crs="EPSG:4326"),
+                        )
+                elif query_target in query_layers:
+                    query_id, query_gdf = query_layers[query_target]
+                    layer_store.add(query_id, query_gdf)
+                else:
+                    query_id = query_target
+                    if query_id not in layer_store:
+                        layer_store.add(query_id, get_boundaries(int(query_id[-1])))
+
+                map_state = st.session_state.get("map") or {}
+                shapes = drawn_shapes(map_state.get("all_drawings"))
+                query_gdf, query_tree = layer_store.index(query_id)
+                draws = st.session_state.setdefault("draw_query_state", DrawQuery())
+                matched = query_gdf.iloc[draws.run(query_id, query_tree, shapes, query_op, query_metres)]
+                fg_query = result_layer(matched, map_state.get("zoom") or ZOOM_START)
+        else:
+            st.session_state.pop("draw_query_state", None)
+
+        if clip_to_view:
+            # clip every active layer to the view st_folium reported last time;
+            # before the first report, send the whole layer at the initial zoom
+            map_state = st.session_state.get("map") or {}
+            viewport = bounds_from_folium(map_state.get("bounds")) or (-180, -90, 180, 90)
+            fg_view = folium.FeatureGroup(name="Layers in view")
+            layer_store = get_layer_store()
+            for layer_id in list(view_layers):
+                if layer_id not in layer_store:
+                    view_layers.remove(layer_id)
+                    continue
+                view = layer_store.query(layer_id, viewport, map_state.get("zoom") or ZOOM_START)
+                geojson_layer(view, view).add_to(fg_view)
+
+        layer_manager.end()
+        metrics.end("layers")
+
+        # Without session layers the page is exactly the cached base map
+        with metrics.span("render"):
+            if layers or clip_to_view or draw_query:
+                m = compose_map(df, layers)
+                html = render_map(m)
+            else:
+                html = get_base_html(df)
+        metrics.record_page(html)
+
+        # Exports run on a background thread pool and are skipped when the
+        # rendered map hasn't changed; index.html is only replaced on request
+        with metrics.span("save"):
+            export_session(html, metrics.session_id)
+            if st.sidebar.button("Publish map as index.html"):
+                publish(html)
+                st.sidebar.success("Publishing map to index.html")
+        metrics.begin("embed")
+        if clip_to_view or draw_query:
+            from streamlit_folium import st_folium
+
+            returned_objects = ["bounds", "zoom"] if clip_to_view else ["zoom"]
+            feature_groups = [fg_view] if clip_to_view else []
+            if draw_query:
+                returned_objects.append("all_drawings")
+                feature_groups.append(fg_query)
+            output = st_folium(
+                m,
+                key="map",
+                width=1200,
+                height=600,
+                returned_objects=returned_objects,
+                feature_group_to_add=feature_groups,
+            )
+        else:
+            output = components.html(html, width=1200, height=610)
+        metrics.end("embed")
+
+        if draw_query and shapes:
+            phrase = QUERY_PHRASES[query_op].format(metres=query_metres)
+            st.markdown(f"**{len(matched):,} of {len(query_gdf):,}** {query_target} features {phrase} the drawn shapes")
+            st.dataframe(summarize(matched))
+            st.dataframe(matched.drop(columns=matched.geometry.name), hide_index=True)
+
+        with st.sidebar.expander("Debug"):
+            if st.checkbox("Show timings and payload sizes", key="debug_panel"):
+                # measuring a layer renders it again, so only do it on request
+                for layer in layers:
+                    metrics.record_layer(layer)
+                run = metrics.as_dict()
+                st.write(f"Rerun: {run['total_s'] * 1000:.0f} ms, page: {run['page_bytes'] / 1e3:.1f} kB")
+                st.write(f"Layers: {layer_manager.built} built, {layer_manager.reused} reused")
+                st.dataframe(
+                    pd.DataFrame(
+                        {"stage": list(run["stages_s"]), "ms": [seconds * 1000 for seconds in run["stages_s"].values()]}
+                    ),
+                    hide_index=True,
+                )
+                if run["layer_bytes"]:
+                    st.dataframe(
+                        pd.DataFrame(
+                            {"layer": list(run["layer_bytes"]), "kB": [nbytes / 1e3 for nbytes in run["layer_bytes"].values()]}
+                        ),
+                        hide_index=True,
+                    )
+            st.checkbox("Profile this session's reruns", key="profile_reruns")
+            if profile is not None:
+                report, dump = profile_report(profile)
+                st.code(report)
+                st.download_button("Download profile (.prof)", dump, file_name="map_stream.prof")
+
+        metrics.finish()
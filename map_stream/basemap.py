@@ -0,0 +1,179 @@
+import copy
+
+import folium
+import folium.plugins
+import streamlit as st
+
+from map_stream.points import CAPITAL_STYLES, point_layer
+from map_stream.tileproxy import tile_layer
+
+# initial zoom of the map, also used to pick the boundary simplification level
+ZOOM_START = 4
+
+
+# display map
+def display_map(df, zoom_start=ZOOM_START):
+
+    df_cleaned = df.dropna(subset=["Latitude", "Longitude"])
+
+    if not df_cleaned.empty:
+        # Calculate the mean of Latitude and Longitude from cleaned DataFrame
+        center_lat = df_cleaned["Latitude"].mean()
+        center_lon = df_cleaned["Longitude"].mean()
+
+        # Create Folium map with the calculated center
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom_start, tiles=None)
+        tile_layer("OpenStreetMap").add_to(m)
+
+        # Add markers for cities, styled per city from CAPITAL_STYLES
+        point_layer(
+            df_cleaned,
+            label="City",
+            styles=CAPITAL_STYLES,
+            style_key="City",
+            name="Capitals",
+        ).add_to(m)
+
+        return m
+    else:
+        # If the DataFrame is empty after dropping NaN values, return None
+        m = folium.Map(location=[50.9375, 6.9603], zoom_start=zoom_start, tiles=None)
+        tile_layer("OpenStreetMap").add_to(m)
+        return m
+
+
+# tile layers, overlays, controls and plugins that every page shows
+def add_base_layers(m):
+    # Add the geocoder plugin to the folium map
+    folium.plugins.Geocoder().add_to(m)
+
+    # add the featuregroup openseamap to the folium map
+    fg = folium.FeatureGroup(name="openseamap", overlay=True, control=True).add_to(m)
+
+    tile_layer("CartoDB dark_matter", show=False).add_to(m)
+
+    tile_layer("CartoDB Voyager", show=False).add_to(m)
+
+    tile_layer(
+        "https://tileserver.memomaps.de/tilegen/{z}/{x}/{y}.png",
+        max_zoom=18,
+        attr='Map <a href="https://memomaps.de/">memomaps.de</a> <a href="http://creativecommons.org/licenses/by-sa/2.0/">CC-BY-SA</a>, map data &copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+        name="PublicTransport",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://server.arcgisonline.com/ArcGIS/rest/services/World_Terrain_Base/MapServer/tile/{z}/{y}/{x}",
+        attr="Tiles &copy; Esri &mdash; Source: USGS, Esri, TANA, DeLorme, and NPS",
+        name="EsriWorldTerrain",
+        max_zoom=13,
+        show=True,
+    ).add_to(m)
+
+    tile_layer(
+        "https://server.arcgisonline.com/ArcGIS/rest/services/NatGeo_World_Map/MapServer/tile/{z}/{y}/{x}",
+        attr="ESRI NatGeoMap",
+        name="ESRI NatGeoMap",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png",
+        name="OSMTopoMap",
+        attr="Map data © OpenStreetMap contributors",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+        attr="ESRI Imagery",
+        name="ESRI Imagery",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://{s}.tile-cyclosm.openstreetmap.fr/cyclosm/{z}/{x}/{y}.png",
+        attr='<a href="https://github.com/cyclosm/cyclosm-cartocss-style/releases" title="CyclOSM - Open Bicycle render">CyclOSM</a> | Map data: &copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors',
+        name="Cyle OSM",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://basemap.nationalmap.gov/arcgis/rest/services/USGSImageryOnly/MapServer/tile/{z}/{y}/{x}",
+        max_zoom=20,
+        attr='Tiles courtesy of the <a href="https://usgs.gov/">U.S. Geological Survey</a>',
+        name="USGS_Imagery",
+        show=False,
+    ).add_to(m)
+
+    tile_layer(
+        "https://basemap.nationalmap.gov/arcgis/rest/services/USGSTopo/MapServer/tile/{z}/{y}/{x}",
+        max_zoom=20,
+        attr='Tiles courtesy of the <a href="https://usgs.gov/">U.S. Geological Survey</a>',
+        name="USGS_TopoMap",
+        show=False,
+    ).add_to(m)
+    # folium.TileLayer("NASAGIBS Blue Marble").add_to(m)
+    # folium.TileLayer("OpenStreetMap",show=True).add_to(m)
+    tile_layer(
+        "http://tiles.openseamap.org/seamark/{z}/{x}/{y}.png",
+        name="OpenSeaMap",
+        attr="Map data © OpenSeaMap contributors",
+    ).add_to(fg)
+
+    # Add layer control to the folium map
+    folium.LayerControl().add_to(m)
+
+    # Add plugins to the folium map
+    folium.LatLngPopup().add_to(m)
+    folium.plugins.MousePosition().add_to(m)
+    folium.plugins.Fullscreen().add_to(m)
+    folium.plugins.LocateControl(auto_start=False).add_to(m)
+    folium.plugins.MeasureControl(
+        position="topright",
+        primary_length_unit="meters",
+        secondary_length_unit="miles",
+        primary_area_unit="sqmeters",
+        secondary_area_unit="acres",
+    ).add_to(m)
+    folium.plugins.MiniMap().add_to(m)
+
+    # Enable drawing control
+    draw_plugin = folium.plugins.Draw(export=True, edit_options={"edit": True})
+    draw_plugin.add_to(m)
+
+    # Add the draw control to the map
+    m.add_child(draw_plugin)
+
+    return m
+
+
+def build_base_map(df, zoom_start=ZOOM_START):
+    m = display_map(df, zoom_start)
+    add_base_layers(m)
+    return m
+
+
+# Everything above is the same for every session and rerun, so it is built
+# once per (capitals frame, zoom) and shared. Never mutate the cached map;
+# compose_map works on a copy.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_base_map(df, zoom_start=ZOOM_START):
+    return build_base_map(df, zoom_start)
+
+
+def render_map(m):
+    return folium.Figure().add_child(m).render()
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_base_html(df, zoom_start=ZOOM_START):
+    return render_map(build_base_map(df, zoom_start))
+
+
+def compose_map(df, layers, zoom_start=ZOOM_START):
+    """Copy of the cached base map with the per-session layers added."""
+    m = copy.deepcopy(get_base_map(df, zoom_start))
+    for layer in layers:
+        layer.add_to(m)
+    return m
@@ -0,0 +1,93 @@
+import argparse
+import os
+
+import geopandas as gpd
+import streamlit as st
+
+from map_stream.parquet import pq, read_geoparquet, to_geoparquet
+
+# Directory holding the bundled GADM shapefiles for Germany
+BOUNDARY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Deutschland"
+)
+# GeoParquet copies written by `python -m map_stream.boundaries`
+PARQUET_DIR = os.path.join(BOUNDARY_DIR, "parquet")
+
+# admin level -> shapefile name inside BOUNDARY_DIR
+BOUNDARY_FILES = {
+    0: "DEU_adm0.shp",
+    1: "DEU_adm1.shp",
+    2: "DEU_adm2.shp",
+    3: "DEU_adm3.shp",
+}
+
+
+def boundary_path(level):
+    if level not in BOUNDARY_FILES:
+        raise ValueError(f"Unknown admin level {level!r}, expected one of {list(BOUNDARY_FILES)}")
+    return os.path.join(BOUNDARY_DIR, BOUNDARY_FILES[level])
+
+
+def parquet_path(level):
+    name = os.path.splitext(BOUNDARY_FILES[level])[0]
+    return os.path.join(PARQUET_DIR, f"{name}.parquet")
+
+
+def source_path(level):
+    # the GeoParquet copy is used while it is at least as new as the shapefile
+    shp = boundary_path(level)
+    parquet = parquet_path(level)
+    if pq is not None and os.path.exists(parquet) and os.path.getmtime(parquet) >= os.path.getmtime(shp):
+        return parquet
+    return shp
+
+
+# The mtime is part of the cache key, so replacing a shapefile on disk
+# makes the next lookup re-read it instead of serving the stale frame.
+@st.cache_resource(show_spinner=False, max_entries=4 * len(BOUNDARY_FILES))
+def _load_boundaries(path, mtime, columns=None):
+    if path.endswith(".parquet"):
+        gdf = read_geoparquet(path, columns)
+    else:
+        gdf = gpd.read_file(path, columns=columns)
+    if gdf.crs is None:
+        gdf.crs = "EPSG:4326"
+    return gdf.to_crs("EPSG:4326")
+
+
+def get_boundaries(level, columns=None):
+    """Return the EPSG:4326 GeoDataFrame for a DEU admin level (0-3).
+
+    Each level is read lazily on first use and then shared by every session
+    of the server process. Callers must treat the frame as read-only.
+    columns limits the attribute columns read (the geometry is always kept).
+    """
+    path = source_path(level)
+    columns = tuple(columns) if columns is not None else None
+    return _load_boundaries(path, os.path.getmtime(path), columns)
+
+
+def boundary_source(level):
+    """Identifies the file a level is read from, as it is now on disk.
+
+    Changes when the shapefile or its GeoParquet copy is replaced, so layers
+    keyed on it (tile server, clip-to-view store) are registered again.
+    """
+    path = source_path(level)
+    return f"boundaries:{path}:{os.path.getmtime(path)}"
+
+
+def build_parquet(levels=None):
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    for level in levels or BOUNDARY_FILES:
+        path = parquet_path(level)
+        to_geoparquet(gpd.read_file(boundary_path(level)).to_crs("EPSG:4326"), path)
+        print(f"{path}: {os.path.getsize(path) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert the DEU boundary shapefiles to GeoParquet"
+    )
+    parser.add_argument("--level", type=int, action="append", choices=sorted(BOUNDARY_FILES))
+    build_parquet(parser.parse_args().level)
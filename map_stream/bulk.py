@@ -0,0 +1,163 @@
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from map_stream.basemap import build_base_map, render_map
+from map_stream.boundaries import get_boundaries
+from map_stream.export import export_html
+from map_stream.join import JOIN_LEVELS, aggregate_points, choropleth_style, locate_points
+from map_stream.layers import geojson_layer
+from map_stream.parquet import read_geoparquet, to_geoparquet
+from map_stream.simplify import pick_zoom, simplify_gdf, to_compact_geojson
+
+# Headless export of one map and data bundle per Bundesland:
+#
+#   python -m map_stream.bulk OUT_DIR [--state Bayern] [--level 2] [--format html]
+#
+# The boundaries are loaded and joined to the points once, then written as
+# uncompressed GeoParquet that every worker process memory-maps, so the
+# page cache holds one copy however many workers run. Each worker renders
+# one state at a time and writes it out before taking the next.
+
+FORMATS = ("html", "geojson", "parquet")
+# The regional maps open around this zoom; their boundaries are simplified
+# for it, the bundles keep the full geometry
+BULK_ZOOM = 8
+# Point data column summed per admin unit, as on the dashboard
+WEIGHT = "Population"
+
+# Data of the export, loaded once per worker by _init_worker
+_units = {}
+_points = None
+
+
+def state_slug(name):
+    return re.sub(r"[^\w-]+", "_", name).strip("_")
+
+
+def prepare(points, levels, directory):
+    """Join points to every level and write what the workers read to directory."""
+    for level in levels:
+        counts = aggregate_points(points, level, weight=WEIGHT)
+        to_geoparquet(counts, os.path.join(directory, f"adm{level}.parquet"))
+    # the Bundesland of every point, to draw each state's own points
+    states = get_boundaries(1, ["NAME_1"])["NAME_1"].to_numpy()
+    idx = locate_points(points["Longitude"].to_numpy(), points["Latitude"].to_numpy(), 1)
+    points = points.assign(state=pd.Series(states[idx], index=points.index).where(idx >= 0))
+    points.to_parquet(os.path.join(directory, "points.parquet"))
+
+
+def _init_worker(directory, levels):
+    global _points
+    # once per state otherwise; the dashboard shows it once per process
+    warnings.filterwarnings("ignore", message="CartoDB tiles now require an API key")
+    for level in levels:
+        _units[level] = read_geoparquet(os.path.join(directory, f"adm{level}.parquet"))
+    _points = pd.read_parquet(os.path.join(directory, "points.parquet"))
+
+
+def export_state(state, out_dir, formats=FORMATS, zoom=BULK_ZOOM):
+    """Write the map and bundle of one Bundesland; return the paths written."""
+    directory = os.path.join(out_dir, state_slug(state))
+    os.makedirs(directory, exist_ok=True)
+    units = {level: gdf[gdf["NAME_1"] == state] for level, gdf in _units.items()}
+    paths = []
+    for level, gdf in units.items():
+        if "geojson" in formats:
+            paths.append(os.path.join(directory, f"DEU_adm{level}.geojson"))
+            with open(paths[-1], "w", encoding="utf-8") as f:
+                f.write(to_compact_geojson(gdf))
+        if "parquet" in formats:
+            paths.append(os.path.join(directory, f"DEU_adm{level}.parquet"))
+            to_geoparquet(gdf, paths[-1])
+
+    if "html" in formats:
+        # the dashboard's page for this state's points, with each level as
+        # a choropleth of the point counts
+        m = build_base_map(_points[_points["state"] == state].drop(columns="state"), zoom)
+        for gdf in units.values():
+            simplified = simplify_gdf(gdf, pick_zoom(zoom), coverage=True)
+            geojson_layer(simplified, to_compact_geojson(simplified), choropleth_style(gdf, "points")).add_to(m)
+        minx, miny, maxx, maxy = next(iter(units.values())).total_bounds
+        m.fit_bounds([[miny, minx], [maxy, maxx]])
+        paths.append(os.path.join(directory, "map.html"))
+        future = export_html(render_map(m), paths[-1], minify=True)
+        if future is not None:
+            future.result()
+    return paths
+
+
+def _export_state(args):
+    state, out_dir, formats, zoom = args
+    paths = export_state(state, out_dir, formats, zoom)
+    return state, paths, sum(os.path.getsize(path) for path in paths)
+
+
+def export_regions(out_dir, points, states=None, levels=JOIN_LEVELS, formats=FORMATS, workers=None, zoom=BULK_ZOOM):
+    """Export every Bundesland (or the named states) to out_dir/<state>/.
+
+    points is a frame like the dashboard's (City, Population, Latitude,
+    Longitude). The states are spread over workers processes, one per CPU
+    by default. Yields (state, paths written, bytes) as states finish.
+    """
+    all_states = sorted(get_boundaries(1, ["NAME_1"])["NAME_1"])
+    states = list(states or all_states)
+    unknown = sorted(set(states) - set(all_states))
+    if unknown:
+        raise ValueError(f"Unknown states {unknown}, expected some of {all_states}")
+
+    directory = tempfile.mkdtemp(prefix="map_stream_bulk_")
+    try:
+        prepare(points, levels, directory)
+        # spawn: workers start clean and only map the prepared files
+        with ProcessPoolExecutor(
+            workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(directory, tuple(levels)),
+        ) as pool:
+            yield from pool.map(_export_state, [(state, out_dir, tuple(formats), zoom) for state in states])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a map and data bundle per Bundesland")
+    parser.add_argument("out_dir")
+    parser.add_argument("--state", action="append", help="Bundesland to export (default: all)")
+    parser.add_argument("--level", type=int, action="append", choices=JOIN_LEVELS, help="admin levels (default: all)")
+    parser.add_argument("--format", action="append", choices=FORMATS, help="outputs (default: all)")
+    parser.add_argument("--points", help="CSV with City, Population, Latitude, Longitude (default: the capitals)")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.points:
+        points = pd.read_csv(args.points)
+    else:
+        from map_stream.app import europe_capital
+
+        points = europe_capital()
+    started = time.perf_counter()
+    total = 0
+    try:
+        for state, paths, nbytes in export_regions(
+            args.out_dir,
+            points,
+            args.state,
+            tuple(args.level or JOIN_LEVELS),
+            tuple(args.format or FORMATS),
+            args.workers,
+        ):
+            total += nbytes
+            print(f"{state}: {len(paths)} files, {nbytes / 1e6:.2f} MB")
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{total / 1e6:.2f} MB in {time.perf_counter() - started:.1f}s")
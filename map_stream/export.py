@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-session copies of the rendered map
+EXPORT_DIR = os.environ.get("MAPSTREAM_EXPORT_DIR", "exports")
+EXPORT_MAX_FILES = 200
+# The page published by the static GitHub Pages workflow
+PUBLISH_PATH = "index.html"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="map-export")
+_lock = threading.Lock()
+# path -> content hash of the last write (or pending write) to it
+_written = {}
+# path -> serializes writers of the same file
+_path_locks = {}
+
+
+def content_hash(html):
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def minify_html(html):
+    # Only whitespace around lines is dropped; folium's markup and scripts
+    # don't depend on indentation or blank lines
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _prune(directory, max_files):
+    try:
+        files = [os.path.join(directory, name) for name in os.listdir(directory)]
+    except FileNotFoundError:
+        return
+    files = sorted((f for f in files if f.endswith((".html", ".html.gz"))), key=os.path.getmtime)
+    pruned = files[: max(0, len(files) - max_files)]
+    for path in pruned:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    # forget the pruned paths too, or a long-running server keeps an entry
+    # for every session it has ever exported; the next export of one of
+    # them simply writes it again
+    with _lock:
+        for path in pruned:
+            _written.pop(path, None)
+            _path_locks.pop(path, None)
+
+
+def _write(path, html, digest, minify, compress):
+    with _lock:
+        path_lock = _path_locks.setdefault(path, threading.Lock())
+    with path_lock:
+        # a newer export of the same path was queued meanwhile; let it win
+        if _written.get(path) != digest:
+            return False
+        data = (minify_html(html) if minify else html).encode("utf-8")
+        _atomic_write(path, data)
+        if compress:
+            _atomic_write(f"{path}.gz", gzip.compress(data, mtime=0))
+        if os.path.dirname(path) == EXPORT_DIR:
+            _prune(EXPORT_DIR, EXPORT_MAX_FILES)
+        return True
+
+
+def export_html(html, path, minify=False, compress=False):
+    """Write html to path on the export thread pool.
+
+    The write is atomic, and skipped when path already holds (or is about
+    to hold) the same content. Returns a Future resolving to whether the
+    file was written, or None when the write was skipped.
+    """
+    digest = content_hash(html)
+    with _lock:
+        if _written.get(path) == digest:
+            return None
+        _written[path] = digest
+    return _executor.submit(_write, path, html, digest, minify, compress)
+
+
+def session_export_path(session_id):
+    return os.path.join(EXPORT_DIR, re.sub(r"[^\w-]", "_", session_id) + ".html")
+
+
+def export_session(html, session_id):
+    """Keep the latest map of a session in EXPORT_DIR/<session_id>.html."""
+    return export_html(html, session_export_path(session_id))
+
+
+def publish(html, path=PUBLISH_PATH, minify=True, compress=True):
+    """Publish html as the static page (plus a .gz copy for the web server)."""
+    return export_html(html, path, minify=minify, compress=compress)
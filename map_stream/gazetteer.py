@@ -0,0 +1,145 @@
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+import streamlit as st
+
+from map_stream.boundaries import get_boundaries
+
+# Levels searched, largest units first: on equal names a Bundesland wins
+# over a Regierungsbezirk, which wins over a Kreis.
+GAZETTEER_LEVELS = (0, 1, 2, 3)
+# Minimum trigram Jaccard similarity for a fuzzy hit
+FUZZY_THRESHOLD = 0.6
+MIN_PREFIX = 3
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def _strip_accents(text):
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)
+    )
+
+
+def normalize_name(name):
+    return " ".join(re.sub(r"[^\w]+", " ", _strip_accents(name.casefold())).split())
+
+
+def name_keys(name):
+    # "Köln" is typed as "koln" as often as "koeln"; index both spellings
+    keys = {normalize_name(name), normalize_name(name.casefold().translate(_UMLAUTS))}
+    keys.discard("")
+    return keys
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _columns(level):
+    # only the names are indexed; the rest is kept for display
+    if level == 0:
+        return ["NAME_0", "NAME_LOCAL", "NAME_ENGLI"]
+    names = [f"NAME_{parent}" for parent in range(level + 1)]
+    return names + [f"VARNAME_{level}", f"TYPE_{level}", f"ENGTYPE_{level}"]
+
+
+def _names(row, level):
+    if level == 0:
+        values = [row.get("NAME_0"), row.get("NAME_LOCAL"), row.get("NAME_ENGLI")]
+    else:
+        values = [row.get(f"NAME_{level}")]
+        varname = row.get(f"VARNAME_{level}")
+        if isinstance(varname, str):
+            values.extend(varname.split("|"))
+    return [v for v in values if isinstance(v, str) and v.strip()]
+
+
+class Gazetteer:
+    """In-process place name index over the bundled DEU admin boundaries.
+
+    Resolves a name by normalized exact match and, when asked for an
+    approximate match, by the shortest indexed name it is a prefix of, then
+    by trigram similarity.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        # key -> [(level, row position), ...] in GAZETTEER_LEVELS order
+        self.exact = defaultdict(list)
+        for level, gdf in frames.items():
+            for pos, row in enumerate(gdf.drop(columns="geometry").to_dict("records")):
+                for name in _names(row, level):
+                    for key in name_keys(name):
+                        if (level, pos) not in self.exact[key]:
+                            self.exact[key].append((level, pos))
+        self.sorted_keys = sorted(self.exact)
+        self.grams = defaultdict(set)
+        for key in self.exact:
+            for gram in trigrams(key):
+                self.grams[gram].add(key)
+
+    def _prefix(self, key):
+        if len(key) < MIN_PREFIX:
+            return None
+        start = bisect.bisect_left(self.sorted_keys, key)
+        hits = []
+        for candidate in self.sorted_keys[start:]:
+            if not candidate.startswith(key):
+                break
+            hits.append(candidate)
+        return min(hits, key=lambda k: (len(k), self.exact[k][0])) if hits else None
+
+    def _fuzzy(self, key):
+        grams = trigrams(key)
+        counts = defaultdict(int)
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                counts[candidate] += 1
+        best, best_score = None, FUZZY_THRESHOLD
+        for candidate, shared in counts.items():
+            score = shared / (len(grams) + len(trigrams(candidate)) - shared)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def resolve(self, name, approximate=False):
+        """Return (level, row position) of the best match for name, or None.
+
+        Only exact matches count unless approximate: "Bern" is a prefix of
+        Bernburg and "Frankfurt" a trigram match of Frankfurt (Oder), while
+        Nominatim knows the places meant.
+        """
+        for key in name_keys(name):
+            if key in self.exact:
+                return self.exact[key][0]
+        if not approximate:
+            return None
+        for find in (self._prefix, self._fuzzy):
+            hits = [hit for hit in map(find, name_keys(name)) if hit is not None]
+            if hits:
+                return min(self.exact[hit][0] for hit in hits)
+        return None
+
+    def lookup(self, name, approximate=False):
+        """Return a one-row EPSG:4326 GeoDataFrame for name, or None."""
+        match = self.resolve(name, approximate)
+        if match is None:
+            return None
+        level, pos = match
+        return self.frames[level].iloc[[pos]]
+
+
+@st.cache_resource(show_spinner=False)
+def get_gazetteer():
+    return Gazetteer(
+        {level: get_boundaries(level, _columns(level)) for level in GAZETTEER_LEVELS}
+    )
+
+
+def lookup_place(name, approximate=False):
+    """Resolve name against the bundled boundaries without any network call."""
+    return get_gazetteer().lookup(name, approximate)
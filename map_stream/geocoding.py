@@ -0,0 +1,178 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from map_stream.net import CACHE_DIR, make_session
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+CACHE_TTL = 30 * 24 * 3600
+# misses are cached too, but retried sooner
+NEGATIVE_TTL = 24 * 3600
+CACHE_MAX_ENTRIES = 50_000
+REQUEST_TIMEOUT = 10
+# attempts per request, and the first wait between them (doubled each time)
+REQUEST_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeoCache:
+    """SQLite-backed key/value cache with TTL and size-based eviction.
+
+    A small in-process LRU sits in front of the database so repeated
+    lookups within one server process never touch the disk.
+    """
+
+    def __init__(self, path, max_entries=CACHE_MAX_ENTRIES, memory_entries=1024):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                row = self.db.execute(
+                    "SELECT value, expires FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return default
+                entry = (json.loads(row[0]), row[1])
+                self.db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            if entry[1] < now:
+                self.memory.pop(key, None)
+                self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return default
+            self._remember(key, entry)
+            return entry[0]
+
+    def set(self, key, value, ttl=CACHE_TTL):
+        now = time.time()
+        entry = (value, now + ttl)
+        with self.lock:
+            self._remember(key, entry)
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), entry[1], now),
+            )
+            count = self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_entries:
+                self.db.execute("DELETE FROM cache WHERE expires < ?", (now,))
+                self.db.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (max(0, count - self.max_entries),),
+                )
+
+
+_MISSING = object()
+
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+# Nominatim usage policy: at most one request per second
+nominatim_bucket = TokenBucket(rate=1.0)
+# Shared by every session of the server process, made on first use so that
+# importing this module touches neither the disk nor the network
+_session = None
+_cache = None
+_shared_lock = threading.Lock()
+
+
+def _shared():
+    global _session, _cache
+    with _shared_lock:
+        if _cache is None:
+            _session = make_session()
+            _cache = GeoCache(os.path.join(CACHE_DIR, "geocode.sqlite"))
+        return _session, _cache
+
+
+def nominatim_search(query, **params):
+    params = {"q": query, "format": "json", "limit": 1, **params}
+    for attempt in range(REQUEST_RETRIES):
+        if attempt:
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        # every attempt counts against the rate limit
+        nominatim_bucket.acquire()
+        try:
+            response = _shared()[0].get(NOMINATIM_URL, params=params, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == REQUEST_RETRIES - 1:
+                raise
+            continue
+        if response.status_code not in RETRY_STATUS or attempt == REQUEST_RETRIES - 1:
+            response.raise_for_status()
+            return response.json()
+
+
+def _cached(kind, query, fetch):
+    key = f"{kind}:{normalize_query(query)}"
+    cache = _shared()[1]
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        try:
+            value = fetch()
+        except (requests.RequestException, ValueError):
+            # network trouble is not an answer, so don't cache it
+            return None
+        cache.set(key, value, CACHE_TTL if value is not None else NEGATIVE_TTL)
+    return value
+
+
+def get_boundary_geojson(place):
+    """Return the GeoJSON geometry Nominatim has for place, or None."""
+
+    def fetch():
+        data = nominatim_search(place, polygon_geojson=1)
+        return data[0]["geojson"] if data else None
+
+    return _cached("boundary", place, fetch)
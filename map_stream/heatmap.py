@@ -0,0 +1,145 @@
+import folium
+import numpy as np
+import pandas as pd
+import streamlit as st
+from branca.element import MacroElement
+from folium.plugins import HeatMap
+from jinja2 import Template
+
+# Cell size on screen, in pixels of a 256px web-mercator tile
+CELL_PX = 16
+BIN_METHODS = ("grid", "hex")
+# Zoom levels the points may be binned for. The page gets the binnings and
+# shows the largest entry <= the map's zoom, so the cells stay about
+# CELL_PX wide however far the user zooms, in either map embed.
+HEATMAP_ZOOMS = (4, 6, 8, 10, 12)
+# A binning with more cells than this fraction of the points no longer
+# aggregates; finer zooms get the raw points instead, if they fit
+HEATMAP_MIN_REDUCTION = 0.5
+# Cells (or raw points) sent across all binnings of one heatmap
+HEATMAP_MAX_CELLS = 50_000
+
+
+def cell_size(zoom, cell_px=CELL_PX):
+    """Width of a bin in degrees of longitude at zoom."""
+    return 360.0 / (256 * 2**zoom) * cell_px
+
+
+def _grid_keys(lat, lon, size):
+    ix = np.floor(lon / size).astype(np.int64)
+    iy = np.floor(lat / size).astype(np.int64)
+    return ix, iy, (ix + 0.5) * size, (iy + 0.5) * size
+
+
+def _hex_keys(lat, lon, size):
+    # pointy-top hexagons of width `size`, cube-coordinate rounding
+    r = size / np.sqrt(3)
+    q = (np.sqrt(3) / 3 * lon - lat / 3) / r
+    s = (2 / 3 * lat) / r
+    x, z = q, s
+    y = -x - z
+    rx, ry, rz = np.round(x), np.round(y), np.round(z)
+    dx, dy, dz = np.abs(rx - x), np.abs(ry - y), np.abs(rz - z)
+    fix_x = (dx > dy) & (dx > dz)
+    fix_z = ~fix_x & (dz >= dy)
+    rx = np.where(fix_x, -ry - rz, rx)
+    rz = np.where(fix_z, -rx - ry, rz)
+    ix, iz = rx.astype(np.int64), rz.astype(np.int64)
+    center_lon = r * np.sqrt(3) * (ix + iz / 2)
+    center_lat = r * 1.5 * iz
+    return ix, iz, center_lon, center_lat
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def bin_points(df, zoom, lat="Latitude", lon="Longitude", weight=None, method="grid"):
+    """Aggregate points into zoom-dependent grid or hex cells.
+
+    Returns one row per non-empty cell with its centre ("lat", "lon"), the
+    number of points ("count") and the summed weight ("weight"; equal to
+    count without a weight column). Cached per (data, zoom, weight, method).
+    """
+    if method not in BIN_METHODS:
+        raise ValueError(f"Unknown binning method {method!r}, expected one of {BIN_METHODS}")
+    points = df[[lat, lon] + ([weight] if weight else [])].dropna()
+    lats = points[lat].to_numpy(dtype=float)
+    lons = points[lon].to_numpy(dtype=float)
+    keys = _grid_keys if method == "grid" else _hex_keys
+    kx, ky, cx, cy = keys(lats, lons, cell_size(zoom))
+    cells = pd.DataFrame(
+        {
+            "kx": kx,
+            "ky": ky,
+            "lon": cx,
+            "lat": cy,
+            "weight": points[weight].to_numpy(dtype=float) if weight else 1.0,
+        }
+    )
+    return (
+        cells.groupby(["kx", "ky"], sort=False)
+        .agg(lat=("lat", "first"), lon=("lon", "first"), count=("weight", "size"), weight=("weight", "sum"))
+        .reset_index(drop=True)
+    )
+
+
+class _ZoomBands(MacroElement):
+    """Shows the one layer of its parent group binned for the map's zoom."""
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            (function() {
+                var group = {{ this._parent.get_name() }};
+                var bands = [{% for zoom, layer in this.bands %}[{{ zoom }}, {{ layer.get_name() }}],{% endfor %}];
+                function pick() {
+                    var zoom = group._map.getZoom(), shown = bands[0][1];
+                    bands.forEach(function(band) { if (band[0] <= zoom) { shown = band[1]; } });
+                    bands.forEach(function(band) {
+                        if (band[1] === shown) { group.addLayer(band[1]); } else { group.removeLayer(band[1]); }
+                    });
+                }
+                group.on("add", function() { group._map.on("zoomend", pick); pick(); });
+                group.on("remove", function() { group._map.off("zoomend", pick); });
+            })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, bands):
+        super().__init__()
+        self._name = "ZoomBands"
+        self.bands = bands
+
+
+def heatmap_layer(df, zooms=HEATMAP_ZOOMS, lat="Latitude", lon="Longitude", weight=None, method="grid", name="Heatmap"):
+    """HeatMap of df binned server-side; only one point per cell is sent.
+
+    The points are binned for the coarsest zoom of zooms, then for finer
+    ones while a binning still aggregates (HEATMAP_MIN_REDUCTION) and all
+    of them fit in HEATMAP_MAX_CELLS. Where binning stops aggregating, the
+    raw points take over if they fit; otherwise the finest binning sent is
+    shown at every closer zoom. The page switches to the matching binning
+    as the map zooms.
+    """
+    points = df[[lat, lon] + ([weight] if weight else [])].dropna()
+    group = folium.FeatureGroup(name=name)
+    bands = []
+    budget = HEATMAP_MAX_CELLS
+    for zoom in sorted(zooms):
+        cells = bin_points(df, zoom, lat, lon, weight, method)
+        if bands and len(cells) > HEATMAP_MIN_REDUCTION * len(points):
+            if len(points) <= budget:
+                raw = points.assign(weight=points[weight] if weight else 1.0)
+                bands.append((zoom, raw[[lat, lon, "weight"]]))
+            break
+        if bands and len(cells) > budget:
+            break
+        bands.append((zoom, cells[["lat", "lon", "weight"]]))
+        budget -= len(cells)
+
+    heats = []
+    for zoom, data in bands:
+        heat = HeatMap(data=data.to_numpy().tolist(), radius=CELL_PX, control=False, show=False)
+        group.add_child(heat)
+        heats.append((zoom, heat))
+    group.add_child(_ZoomBands(heats))
+    return group
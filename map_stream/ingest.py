@@ -0,0 +1,137 @@
+import os
+import shutil
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyogrio
+import shapely
+
+from map_stream.simplify import zoom_tolerance
+
+# Features read, reprojected and simplified at a time
+BATCH_SIZE = 20_000
+# Uploads are simplified for display up to this zoom; finer detail than a
+# pixel at z12 (~10 m) never reaches the screen through the dashboard
+INGEST_SIMPLIFY_ZOOM = 12
+DATASET_SUFFIXES = (".shp", ".geojson", ".json")
+# Features a geometry worker reads, repairs, simplifies and serializes as
+# one job; see map_stream.workers
+SHARD_ROWS = 50_000
+# Formats whose rows can be read from any offset without parsing the ones
+# before (a shapefile's .shx indexes its records). GDAL parses e.g. GeoJSON
+# from the start for every offset, so those are read by one reader.
+SEEKABLE_SUFFIXES = (".shp",)
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+
+def save_uploads(uploaded_files, directory, chunk_size=1 << 20):
+    """Copy Streamlit UploadedFiles into directory and return their paths."""
+    paths = []
+    for uploaded in uploaded_files:
+        path = os.path.join(directory, os.path.basename(uploaded.name))
+        uploaded.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(uploaded, f, chunk_size)
+        paths.append(path)
+    return paths
+
+
+def count_features(path):
+    try:
+        return max(pyogrio.read_info(path)["features"], 0)
+    except Exception:
+        return 0
+
+
+def iter_batches(path, batch_size=BATCH_SIZE):
+    """Yield GeoDataFrames of at most batch_size features read from path."""
+    if HAS_ARROW:
+        with pyogrio.open_arrow(path, batch_size=batch_size, use_pyarrow=True) as (meta, reader):
+            geometry_name = meta["geometry_name"] or "wkb_geometry"
+            for batch in reader:
+                attrs = batch.drop_columns([geometry_name]).to_pandas()
+                geoms = shapely.from_wkb(batch.column(geometry_name).to_numpy(zero_copy_only=False))
+                yield gpd.GeoDataFrame(attrs, geometry=geoms, crs=meta["crs"])
+        return
+
+    start = 0
+    while True:
+        batch = pyogrio.read_dataframe(path, skip_features=start, max_features=batch_size)
+        if batch.empty:
+            return
+        yield batch
+        start += len(batch)
+
+
+def prepare_batch(batch, simplify_zoom=INGEST_SIMPLIFY_ZOOM):
+    if batch.crs is None:
+        batch = batch.set_crs("EPSG:4326")
+    batch = batch.to_crs("EPSG:4326")
+    # self-intersecting rings from hand-drawn data break simplification and
+    # the point-in-polygon join; repair the few that are invalid
+    geoms = np.asarray(batch.geometry.values)
+    invalid = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    if invalid.any():
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+        batch.geometry = geoms
+    if simplify_zoom is not None:
+        batch.geometry = shapely.simplify(
+            batch.geometry.values, zoom_tolerance(simplify_zoom), preserve_topology=True
+        )
+    return batch
+
+
+def plan_shards(paths, shard_rows=SHARD_ROWS):
+    """Split every dataset in paths into (path, start, count) row ranges.
+
+    Only seekable datasets are split. Any other dataset (or one whose count
+    is unknown) is one shard with count None, to be read to the end in one
+    pass; its features aren't counted, which would parse it once more.
+    """
+    shards = []
+    for path in paths:
+        if not path.lower().endswith(DATASET_SUFFIXES):
+            continue
+        total = count_features(path) if path.lower().endswith(SEEKABLE_SUFFIXES) else 0
+        if not total:
+            shards.append((path, 0, None))
+            continue
+        shards += [(path, start, min(shard_rows, total - start)) for start in range(0, total, shard_rows)]
+    return shards
+
+
+def read_shard(path, start, count, simplify_zoom=INGEST_SIMPLIFY_ZOOM):
+    """Read count features of path from row start, ready for display."""
+    os.environ["SHAPE_RESTORE_SHX"] = "YES"
+    batch = pyogrio.read_dataframe(path, skip_features=start, max_features=count, use_arrow=HAS_ARROW)
+    return prepare_batch(batch, simplify_zoom)
+
+
+def read_batched(paths, progress=None, batch_size=BATCH_SIZE, simplify_zoom=INGEST_SIMPLIFY_ZOOM):
+    """Read every dataset in paths batch by batch into one EPSG:4326 frame.
+
+    Each batch is reprojected and simplified before the next one is read,
+    so the raw, full-resolution data is never held in memory all at once.
+    progress(done, total) is called after every batch.
+    """
+    os.environ["SHAPE_RESTORE_SHX"] = "YES"
+    datasets = [p for p in paths if p.lower().endswith(DATASET_SUFFIXES)]
+    total = sum(count_features(p) for p in datasets)
+    done = 0
+    parts = []
+    for path in datasets:
+        for batch in iter_batches(path, batch_size):
+            parts.append(prepare_batch(batch, simplify_zoom))
+            done += len(batch)
+            if progress is not None:
+                progress(done, max(total, done))
+    if not parts:
+        return None
+    return gpd.GeoDataFrame(pd.concat(parts, ignore_index=True), crs="EPSG:4326")
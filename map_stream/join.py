@@ -0,0 +1,126 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import shapely
+import streamlit as st
+from branca.colormap import linear
+
+from map_stream.boundaries import get_boundaries
+from map_stream.simplify import pick_zoom, simplify_gdf, to_compact_geojson
+
+# Admin levels points can be joined to (adm0 is the whole country)
+JOIN_LEVELS = (1, 2, 3)
+# Below this many points a process pool costs more than it saves
+SHARD_MIN_POINTS = 500_000
+
+# STRtree of the polygons, built once per worker process
+_worker_tree = None
+
+
+def _columns(level):
+    # names of the unit and its parents; enough to label a choropleth
+    return [f"NAME_{parent}" for parent in range(1, level + 1)]
+
+
+def _build_tree(polygons):
+    # STRtree.query(predicate=...) prepares the query points, not the
+    # polygons; prepare the polygons ourselves and test them explicitly
+    shapely.prepare(polygons)
+    return shapely.STRtree(polygons)
+
+
+@st.cache_resource(show_spinner=False)
+def get_tree(level):
+    return _build_tree(get_boundaries(level, _columns(level)).geometry.values.copy())
+
+
+def _locate(tree, lon, lat):
+    points = shapely.points(lon, lat)
+    point_idx, polygon_idx = tree.query(points)
+    hit = shapely.intersects(tree.geometries[polygon_idx], points[point_idx])
+    point_idx, polygon_idx = point_idx[hit], polygon_idx[hit]
+    # a point on a shared border matches both sides; keep the first polygon
+    # by writing the pairs in reverse
+    result = np.full(len(points), -1, dtype=np.int64)
+    result[point_idx[::-1]] = polygon_idx[::-1]
+    return result
+
+
+def _init_worker(wkb):
+    global _worker_tree
+    _worker_tree = _build_tree(shapely.from_wkb(wkb))
+
+
+def _locate_shard(shard):
+    return _locate(_worker_tree, *shard)
+
+
+def locate_points(lon, lat, level, workers=None):
+    """Row position in the level's boundaries of every point, -1 outside.
+
+    With workers > 1 and at least SHARD_MIN_POINTS points, the points are
+    split into one shard per worker and located in a process pool.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if not workers or workers < 2 or len(lon) < SHARD_MIN_POINTS:
+        return _locate(get_tree(level), lon, lat)
+    wkb = shapely.to_wkb(get_tree(level).geometries)
+    shards = zip(np.array_split(lon, workers), np.array_split(lat, workers))
+    # spawn: forking the multi-threaded Streamlit server is not safe
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(wkb,),
+    ) as pool:
+        return np.concatenate(list(pool.map(_locate_shard, shards)))
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def aggregate_points(df, level, lat="Latitude", lon="Longitude", weight=None, workers=None):
+    """Count (and sum weight of) the points of df per DEU admin unit.
+
+    Returns the level's boundaries with its name columns, a "points" count
+    and, with a weight column, that column summed per unit. Units without
+    points are kept with zeros so a choropleth covers the whole country.
+    """
+    points = df[[lat, lon] + ([weight] if weight else [])].dropna()
+    idx = locate_points(points[lon].to_numpy(), points[lat].to_numpy(), level, workers)
+    inside = idx >= 0
+    boundaries = get_boundaries(level, _columns(level))
+    gdf = boundaries[_columns(level) + ["geometry"]].copy()
+    gdf["points"] = np.bincount(idx[inside], minlength=len(gdf))
+    if weight:
+        weights = points[weight].to_numpy(dtype=float)[inside]
+        gdf[weight] = np.bincount(idx[inside], weights=weights, minlength=len(gdf))
+    return gdf
+
+
+@st.cache_resource(show_spinner=False)
+def _simplified_geometry(level, zoom):
+    return simplify_gdf(get_boundaries(level, _columns(level)), zoom, coverage=True).geometry
+
+
+def choropleth_geojson(gdf, level, zoom_start):
+    """GeoJSON of an aggregate_points result on geometry simplified for zoom_start."""
+    geometry = _simplified_geometry(level, pick_zoom(zoom_start))
+    return to_compact_geojson(gdf.drop(columns=gdf.geometry.name).join(geometry, how="inner").set_geometry(geometry.name))
+
+
+def choropleth_style(gdf, column):
+    """GeoJson style_function colouring features by gdf[column]."""
+    low, high = float(gdf[column].min()), float(gdf[column].max())
+    colormap = linear.YlOrRd_09.scale(low, high if high > low else low + 1)
+
+    def style_function(feature):
+        value = feature["properties"].get(column) or 0
+        return {
+            "fillColor": colormap(value),
+            "color": "#555555",
+            "weight": 0.5,
+            "fillOpacity": 0.7 if value else 0.1,
+        }
+
+    return style_function
@@ -0,0 +1,137 @@
+import copy
+import hashlib
+
+import folium
+from branca.element import Element, Figure
+from folium.map import Layer
+from jinja2 import Template
+
+import streamlit as st
+
+# Parts of the page a layer's render adds to; see branca's Figure
+SECTIONS = ("header", "html", "script")
+# Name layers are rendered under in place of their parent's, and which is
+# replaced by the real parent's name whenever the page is put together
+PARENT_PLACEHOLDER = "layer_manager_parent"
+
+
+class _Text(Element):
+    """Page text rendered earlier, emitted as is (not as a template)."""
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+
+    def render(self, **kwargs):
+        return self.text
+
+
+class RenderedLayer(Layer):
+    """What a layer and its children add to the page, rendered once.
+
+    It keeps the original layer's name and id, so its script, the layer
+    control and st_folium refer to it exactly as to the layer itself.
+    """
+
+    # st_folium collects each element's script macro instead of rendering
+    _template = Template("{% macro script(this, kwargs) %}{{ this.text('script') }}{% endmacro %}")
+
+    def __init__(self, layer, parts):
+        super().__init__(
+            overlay=getattr(layer, "overlay", True),
+            control=getattr(layer, "control", False),
+            show=getattr(layer, "show", True),
+        )
+        self._name, self._id = layer._name, layer._id
+        self.layer_name = getattr(layer, "layer_name", None) or self.get_name()
+        self.kind = type(layer).__name__
+        # section -> [(name, text)], except "script": one text in page order
+        self.parts = parts
+        self.nbytes = len(parts["script"].encode("utf-8")) + sum(
+            len(text.encode("utf-8")) for section in ("header", "html") for _, text in parts[section]
+        )
+
+    def text(self, section, text=None):
+        return (text or self.parts[section]).replace(PARENT_PLACEHOLDER, self._parent.get_name())
+
+    def render(self, **kwargs):
+        figure = self.get_root()
+        for section in ("header", "html"):
+            for name, text in self.parts[section]:
+                getattr(figure, section).add_child(_Text(self.text(section, text)), name=name)
+        figure.script.add_child(_Text(self.text("script")), name=self.get_name())
+
+
+class _Parent(folium.Map):
+    def get_name(self):
+        return PARENT_PLACEHOLDER
+
+
+def render_layer(layer):
+    """Render layer and its children once, for any parent."""
+    figure = Figure()
+    m = _Parent(tiles=None)
+    figure.add_child(m)
+    m.add_child(layer)
+    before = {section: set(getattr(figure, section)._children) for section in SECTIONS}
+    layer.render()
+    parts = {
+        section: [
+            (name, child.render())
+            for name, child in getattr(figure, section)._children.items()
+            if name not in before[section]
+        ]
+        for section in SECTIONS
+    }
+    # joined the way branca joins the children of the page's script
+    parts["script"] = "\n    ".join(text for _, text in parts["script"])
+    return RenderedLayer(layer, parts)
+
+
+def source_hash(*parts):
+    """Short hash of strings/bytes, e.g. a layer's GeoJSON."""
+    h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(part.encode("utf-8") if isinstance(part, str) else part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class LayerManager:
+    """The layers a session shows, kept rendered across reruns.
+
+    Every rerun asks for its layers by key (what the layer shows and how it
+    is styled). Layers asked for the run before are reused as rendered; only
+    new keys are built and rendered. end() forgets the layers this run did
+    not ask for.
+    """
+
+    def __init__(self):
+        self.layers = {}
+        self.requested = {}
+        self.built = 0
+        self.reused = 0
+
+    def begin(self):
+        self.requested = {}
+        self.built = self.reused = 0
+
+    def layer(self, key, build):
+        """The rendered layer for key; build() makes the folium layer if needed."""
+        layer = self.requested.get(key) or self.layers.get(key)
+        if layer is None:
+            layer = render_layer(build())
+            self.built += 1
+        elif key not in self.requested:
+            self.reused += 1
+        self.requested[key] = layer
+        # a copy per map: st_folium renames the elements it embeds
+        return copy.copy(layer)
+
+    def end(self):
+        self.layers = self.requested
+
+
+def get_layer_manager():
+    """This session's LayerManager."""
+    return st.session_state.setdefault("layer_manager", LayerManager())
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import folium
+import shapely
+import streamlit as st
+
+from map_stream.simplify import pick_zoom, simplify_gdf
+
+# Fraction of the viewport width/height added on each side, so small pans
+# don't immediately expose unclipped edges
+VIEWPORT_BUFFER = 0.25
+
+
+def layer_key(gdf):
+    """Content hash of a GeoDataFrame, stable across reruns and sessions."""
+    h = hashlib.sha1()
+    h.update(",".join(map(str, gdf.columns)).encode())
+    for wkb in shapely.to_wkb(gdf.geometry.values):
+        h.update(wkb or b"")
+    h.update(gdf.drop(columns=gdf.geometry.name).to_csv(index=False).encode())
+    return h.hexdigest()[:16]
+
+
+def geojson_layer(gdf, data, style_function=None):
+    """Styled GeoJson layer of data with popup and tooltip of gdf's columns."""
+
+    def highlight_function(feature):
+        return {
+            "fillColor": "#ff0000",
+            "color": "#000000",
+            "weight": 1,
+            "fillOpacity": 0.5,
+        }
+
+    jsond = folium.GeoJson(
+        data, style_function=style_function, highlight_function=highlight_function
+    )
+    folium.GeoJsonPopup(
+        fields=[col for col in gdf.columns if col != "geometry"]
+    ).add_to(jsond)
+    folium.GeoJsonTooltip(
+        fields=[col for col in gdf.columns if col != "geometry"],
+        style=(
+            """background-color: grey; color: white; font-family:"
+courier new; font-size: 24px; padding: 10px;"""
+        ),
+    ).add_to(jsond)
+
+    return jsond
+
+
+def bounds_from_folium(bounds):
+    """Convert st_folium's bounds dict to (minx, miny, maxx, maxy), or None."""
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        return sw["lng"], sw["lat"], ne["lng"], ne["lat"]
+    except (KeyError, TypeError):
+        return None
+
+
+def buffer_bounds(bounds, buffer=VIEWPORT_BUFFER):
+    minx, miny, maxx, maxy = bounds
+    dx, dy = (maxx - minx) * buffer, (maxy - miny) * buffer
+    return (max(minx - dx, -180), max(miny - dy, -90), min(maxx + dx, 180), min(maxy + dy, 90))
+
+
+class LayerStore:
+    """STRtree-indexed EPSG:4326 layers keyed by layer id.
+
+    Least recently used layers are dropped once more than max_layers are
+    held, so uploads from finished sessions don't pile up.
+    """
+
+    def __init__(self, max_layers=32):
+        self.max_layers = max_layers
+        self.layers = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, layer_id):
+        return layer_id in self.layers
+
+    def add(self, layer_id, gdf):
+        with self.lock:
+            if layer_id in self.layers:
+                self.layers.move_to_end(layer_id)
+                return
+        if gdf.crs is None:
+            gdf = gdf.set_crs("EPSG:4326")
+        gdf = gdf.to_crs("EPSG:4326")
+        tree = shapely.STRtree(gdf.geometry.values)
+        with self.lock:
+            self.layers[layer_id] = (gdf, tree)
+            while len(self.layers) > self.max_layers:
+                self.layers.popitem(last=False)
+
+    def get(self, layer_id):
+        return self.layers[layer_id][0]
+
+    def index(self, layer_id):
+        """(GeoDataFrame, STRtree) of a layer."""
+        with self.lock:
+            self.layers.move_to_end(layer_id)
+            return self.layers[layer_id]
+
+    def query(self, layer_id, bounds, zoom=None):
+        """Features of a layer intersecting bounds, clipped to its buffered box.
+
+        With zoom, the clipped geometries are also simplified for that zoom.
+        """
+        with self.lock:
+            gdf, tree = self.layers[layer_id]
+            self.layers.move_to_end(layer_id)
+        clip_box = buffer_bounds(bounds)
+        idx = tree.query(shapely.box(*clip_box), predicate="intersects")
+        idx.sort()
+        view = gdf.iloc[idx].copy()
+        view.geometry = shapely.clip_by_rect(view.geometry.values, *clip_box)
+        if zoom is not None:
+            view = simplify_gdf(view, pick_zoom(zoom))
+        return view[~view.geometry.is_empty]
+
+
+@st.cache_resource(show_spinner=False)
+def get_layer_store():
+    return LayerStore()
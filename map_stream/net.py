@@ -0,0 +1,38 @@
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+# Shared by everything that talks HTTP: Nominatim lookups, the tile proxy,
+# and the local vector tile and metrics servers
+USER_AGENT = "map_stream/1.0 (+https://mapstream-geosuren.streamlit.app/)"
+
+# Root of the on-disk caches (lookups, tiles, uploads); each is created on
+# first use, never on import
+CACHE_DIR = os.environ.get(
+    "MAPSTREAM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "map_stream")
+)
+
+
+def make_session(pool_connections=4, pool_maxsize=16):
+    """requests.Session with pooled connections and our User-Agent."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def serve(host, port, handler):
+    """Serve handler on a daemon thread and return the server.
+
+    Callers wrap this in st.cache_resource, so each server starts once per
+    process however many sessions ask for it.
+    """
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,50 @@
+import json
+
+import geopandas as gpd
+import shapely
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+def _geo_crs(column_meta):
+    # GeoParquet stores PROJJSON; building a CRS from the EPSG id is much
+    # cheaper than parsing the whole document, and a missing crs means 4326
+    crs = column_meta.get("crs", "EPSG:4326")
+    if isinstance(crs, dict):
+        ident = crs.get("id") or {}
+        if ident.get("authority") and ident.get("code"):
+            return f"{ident['authority']}:{ident['code']}"
+    return crs
+
+
+def to_geoparquet(gdf, path):
+    """Write gdf as uncompressed, WKB-encoded GeoParquet.
+
+    No compression keeps the file memory-mappable without a decode pass;
+    the bundled layers are small enough that disk size does not matter.
+    """
+    gdf.to_parquet(path, compression=None, geometry_encoding="WKB", write_covering_bbox=False)
+
+
+def read_geoparquet(path, columns=None):
+    """Read a GeoParquet file memory-mapped, projecting to columns.
+
+    Only the requested attribute columns (plus the geometry) are decoded;
+    columns=None reads them all.
+    """
+    if pq is None:
+        raise ImportError("pyarrow is required to read GeoParquet")
+    schema = pq.read_schema(path, memory_map=True)
+    geo = json.loads(schema.metadata[b"geo"])
+    geometry = geo["primary_column"]
+    if columns is not None:
+        columns = [c for c in columns if c != geometry] + [geometry]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    geoms = shapely.from_wkb(table.column(geometry).to_numpy(zero_copy_only=False))
+    attrs = table.drop_columns([geometry]).to_pandas()
+    return gpd.GeoDataFrame(
+        attrs, geometry=geoms, crs=_geo_crs(geo["columns"][geometry])
+    )
@@ -0,0 +1,129 @@
+import json
+
+import numpy as np
+import pandas as pd
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+
+# Style used for rows without an entry in the style table
+DEFAULT_MARKER_STYLE = {"color": "blue", "icon": "info-sign"}
+
+# Per-city marker styles of the capitals layer
+CAPITAL_STYLES = pd.DataFrame(
+    {
+        "City": ["London", "Paris", "Rome", "Vienna"],
+        "color": ["orange", "red", "green", "darkpurple"],
+        "icon": ["cloud", "heart", "heart", "heart"],
+    }
+)
+
+# Below this many points every marker is drawn on its own
+CLUSTER_MIN_POINTS = 500
+
+# The data arrives column-wise (lat, lon, label, style index per point)
+# and every style is sent once
+_CALLBACK = """
+    var styles = %s;
+    var callback = function (data, i) {
+        var style = styles[data.style[i]];
+        var marker = L.marker(new L.LatLng(data.lat[i], data.lon[i]));
+        marker.setIcon(L.AwesomeMarkers.icon({
+            markerColor: style.color, icon: style.icon, prefix: "glyphicon", iconColor: "white"
+        }));
+        if (data.label !== null && data.label[i] !== null) {
+            marker.bindTooltip(String(data.label[i]));
+            marker.bindPopup(String(data.label[i]));
+        }
+        return marker;
+    };
+"""
+
+
+class PointLayer(FastMarkerCluster):
+    """FastMarkerCluster fed with prevalidated columns.
+
+    FastMarkerCluster validates every location in Python and serializes
+    per-row lists through Jinja's tojson; point_layer has already validated
+    the points column-wise, and the columns are dumped to JSON directly.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+
+                var data = {{ this.data_json }};
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+
+                for (var i = 0; i < data.lat.length; i++) {
+                    callback(data, i).addTo(cluster);
+                }
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, columns, styles, cluster=True, name=None, **kwargs):
+        if not cluster:
+            kwargs["disableClusteringAtZoom"] = 0
+        super().__init__([], callback=_CALLBACK % json.dumps(styles), name=name, **kwargs)
+        self.data = columns
+        # escaped like Jinja's tojson so labels can't close the <script>
+        self.data_json = (
+            json.dumps(columns, separators=(",", ":"))
+            .replace("<", "\\u003c")
+            .replace(">", "\\u003e")
+            .replace("&", "\\u0026")
+        )
+
+
+def point_layer(
+    df,
+    lat="Latitude",
+    lon="Longitude",
+    label=None,
+    styles=None,
+    style_key=None,
+    name="Points",
+    cluster=None,
+):
+    """Build one client-side marker layer for all rows of df.
+
+    styles is a table with a style_key column plus "color" and "icon"
+    (AwesomeMarkers colour and glyphicon name); rows are matched to it by
+    style_key, unmatched rows get DEFAULT_MARKER_STYLE. Markers are
+    clustered when there are at least CLUSTER_MIN_POINTS of them unless
+    cluster says otherwise. All per-row work is done on whole columns.
+    """
+    coords = df[[lat, lon]].to_numpy(dtype=float)
+    valid = (
+        np.isfinite(coords).all(axis=1)
+        & (np.abs(coords[:, 0]) <= 90)
+        & (np.abs(coords[:, 1]) <= 180)
+    )
+    df = df[valid]
+    coords = coords[valid]
+
+    style_table = [DEFAULT_MARKER_STYLE]
+    style_idx = np.zeros(len(df), dtype=int)
+    if styles is not None and style_key is not None:
+        style_table += styles[["color", "icon"]].to_dict("records")
+        lookup = pd.Series(np.arange(1, len(styles) + 1), index=styles[style_key].to_numpy())
+        style_idx = df[style_key].map(lookup).fillna(0).astype(int).to_numpy()
+
+    labels = None
+    if label is not None:
+        labels = df[label].astype(object).where(df[label].notna(), None).tolist()
+
+    if cluster is None:
+        cluster = len(df) >= CLUSTER_MIN_POINTS
+    columns = {
+        "lat": coords[:, 0].tolist(),
+        "lon": coords[:, 1].tolist(),
+        "label": labels,
+        "style": style_idx.tolist(),
+    }
+    return PointLayer(columns, style_table, cluster=cluster, name=name)
@@ -0,0 +1,95 @@
+import hashlib
+
+import folium
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from map_stream.layers import geojson_layer
+from map_stream.simplify import pick_zoom, to_compact_geojson, zoom_tolerance
+
+# Tests of a layer's features against the shapes drawn on the map: touching
+# a shape, lying inside one, or lying within a distance of one
+QUERY_OPS = ("intersects", "within", "buffer")
+QUERY_PHRASES = {"intersects": "touch", "within": "lie inside", "buffer": "lie within {metres:,} m of"}
+BUFFER_METRES = 1_000
+
+
+def drawn_shapes(drawings):
+    """Shapes of st_folium's all_drawings, by a hash of their geometry.
+
+    Circles arrive as their centre point; query them with a buffer.
+    """
+    shapes = {}
+    for feature in drawings or ():
+        try:
+            geom = shapely.geometry.shape(feature["geometry"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if geom.is_empty:
+            continue
+        # a polygon drawn across itself is invalid
+        geom = shapely.make_valid(geom)
+        shapes[hashlib.sha1(shapely.to_wkb(geom)).hexdigest()[:16]] = geom
+    return shapes
+
+
+def buffer_metres(geom, metres):
+    """geom grown by metres, measured in its UTM zone."""
+    series = gpd.GeoSeries([geom], crs="EPSG:4326")
+    return series.to_crs(series.estimate_utm_crs()).buffer(metres).to_crs("EPSG:4326").iloc[0]
+
+
+def match_shape(tree, geom, op, metres=BUFFER_METRES):
+    """Sorted positions of the tree's geometries that pass op against geom."""
+    if op == "buffer":
+        geom, op = buffer_metres(geom, metres), "intersects"
+    # the tree tests predicate(geom, feature), and geom contains a feature
+    # exactly when the feature is within geom
+    idx = tree.query(geom, predicate="contains" if op == "within" else "intersects")
+    idx.sort()
+    return idx
+
+
+class DrawQuery:
+    """Features of a layer matching any drawn shape, remembered per shape.
+
+    Drawing or editing one shape queries the index for that shape only; the
+    matches of every unchanged shape are reused. Kept in session_state.
+    """
+
+    def __init__(self):
+        self.matches = {}
+
+    def run(self, layer_id, tree, shapes, op, metres=BUFFER_METRES):
+        setting = (layer_id, op, metres if op == "buffer" else None)
+        matches = {}
+        for shape_id, geom in shapes.items():
+            key = (*setting, shape_id)
+            matches[key] = self.matches[key] if key in self.matches else match_shape(tree, geom, op, metres)
+        # forget deleted shapes and other settings
+        self.matches = matches
+        if not matches:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(list(matches.values())))
+
+
+def summarize(gdf):
+    """Number of features and the sum of every numeric column of gdf."""
+    numeric = gdf.drop(columns=gdf.geometry.name).select_dtypes("number")
+    return pd.concat([pd.Series({"features": len(gdf)}), numeric.sum()]).rename("total")
+
+
+def result_style(feature):
+    return {"color": "#ffd400", "fillColor": "#ffd400", "weight": 3, "fillOpacity": 0.4}
+
+
+def result_layer(gdf, zoom, name="Query result"):
+    """Feature group highlighting gdf, simplified for zoom."""
+    gdf = gdf.copy()
+    gdf.geometry = shapely.simplify(gdf.geometry.values, zoom_tolerance(pick_zoom(zoom)), preserve_topology=True)
+    group = folium.FeatureGroup(name=name)
+    if len(gdf):
+        geojson_layer(gdf, to_compact_geojson(gdf), result_style).add_to(group)
+    return group
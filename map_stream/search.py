@@ -0,0 +1,95 @@
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import shape
+
+from map_stream.gazetteer import lookup_place
+from map_stream.geocoding import get_boundary_geojson, normalize_query
+
+# Nominatim lookups in flight at once; the shared token bucket still keeps
+# them at its rate, the pool only overlaps their latency and retries
+SEARCH_WORKERS = 8
+# Upper bound for one search, however many places it has
+SEARCH_DEADLINE = 60
+MAX_PLACES = 200
+
+_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="place-search")
+
+
+def split_places(text):
+    """Split a comma, semicolon or newline separated list of place names."""
+    return [name.strip() for name in re.split(r"[,;\n]", text or "") if name.strip()]
+
+
+def places_from_csv(file, column=None):
+    """Place names from a CSV column (the first one by default)."""
+    names = pd.read_csv(file, dtype=str)
+    column = column or names.columns[0]
+    return names[column].dropna().str.strip().loc[lambda s: s != ""].tolist()
+
+
+def unique_places(names):
+    # keep the first spelling of names that normalize the same
+    seen = {}
+    for name in names:
+        seen.setdefault(normalize_query(name), name)
+    return list(seen.values())
+
+
+def _remote_place(name):
+    geometry = get_boundary_geojson(name)
+    if geometry is None:
+        return None
+    return gpd.GeoDataFrame(geometry=[shape(geometry)], crs="EPSG:4326")
+
+
+def search_places(names, deadline=SEARCH_DEADLINE):
+    """Resolve place names to boundaries as one GeoDataFrame.
+
+    Exact names of the bundled DEU gazetteer answer first; the remaining
+    names are looked up on Nominatim concurrently (cached, rate limited and
+    retried by map_stream.geocoding), and the names Nominatim does not know
+    (or can't be asked about, offline) get the gazetteer's closest prefix or
+    fuzzy match. Names not resolved within deadline seconds are
+    reported as missing; their lookups finish in the background and fill
+    the cache for the next search. Only the first MAX_PLACES names are
+    searched; the rest are reported as missing too. Returns (gdf with a
+    "query" column, list of names not found).
+    """
+    names = unique_places(names)
+    names, skipped = names[:MAX_PLACES], names[MAX_PLACES:]
+    found = {}
+    remote = []
+    for name in names:
+        local = lookup_place(name)
+        if local is not None:
+            found[name] = local[["geometry"]]
+        else:
+            remote.append(name)
+
+    futures = {_executor.submit(_remote_place, name): name for name in remote}
+    pending = set(futures)
+    end = time.monotonic() + deadline
+    while pending:
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            gdf = future.result()
+            if gdf is None:
+                gdf = lookup_place(name, approximate=True)
+                gdf = gdf[["geometry"]] if gdf is not None else None
+            if gdf is not None:
+                found[name] = gdf
+
+    frames = [found[name].assign(query=name) for name in names if name in found]
+    missing = [name for name in names if name not in found] + skipped
+    if not frames:
+        return gpd.GeoDataFrame({"query": []}, geometry=[], crs="EPSG:4326"), missing
+    gdf = pd.concat(frames, ignore_index=True)
+    return gdf[["query", "geometry"]], missing
@@ -0,0 +1,100 @@
+import argparse
+import os
+
+import shapely
+import streamlit as st
+
+from map_stream.boundaries import BOUNDARY_DIR, BOUNDARY_FILES, boundary_path, get_boundaries
+
+# Prebuilt output of `python -m map_stream.simplify`
+SIMPLIFIED_DIR = os.path.join(BOUNDARY_DIR, "simplified")
+
+# Zoom levels we keep a simplified copy for. A map opened at zoom z uses
+# the largest entry <= z, so the detail never exceeds what the screen shows.
+SIMPLIFY_ZOOMS = (4, 6, 8, 10)
+
+
+def zoom_tolerance(zoom):
+    # Half a 256px web-mercator tile pixel, in degrees at the equator
+    return 360.0 / (256 * 2**zoom) / 2
+
+
+def zoom_precision(zoom):
+    # Enough decimals to keep coordinates below a tenth of a pixel
+    return max(3, min(7, zoom // 3 + 3))
+
+
+def pick_zoom(zoom_start):
+    candidates = [z for z in SIMPLIFY_ZOOMS if z <= zoom_start]
+    return max(candidates) if candidates else min(SIMPLIFY_ZOOMS)
+
+
+def simplified_path(level, zoom):
+    name = os.path.splitext(BOUNDARY_FILES[level])[0]
+    return os.path.join(SIMPLIFIED_DIR, f"{name}_z{zoom}.geojson")
+
+
+def simplify_gdf(gdf, zoom, coverage=False):
+    """Return a copy of gdf simplified and quantized for display at zoom.
+
+    coverage says gdf's polygons tile an area without overlaps, like the DEU
+    admin units; any other layer (points, lines, uploads) is simplified
+    feature by feature.
+    """
+    gdf = gdf.copy()
+    tolerance = zoom_tolerance(zoom)
+    geoms = gdf.geometry.values
+    if coverage and hasattr(shapely, "coverage_simplify"):
+        # Admin polygons form a coverage, so simplify shared edges once and
+        # keep neighbouring districts free of gaps and slivers.
+        geoms = shapely.coverage_simplify(geoms, tolerance)
+    else:
+        geoms = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    geoms = shapely.set_precision(geoms, 10 ** -zoom_precision(zoom))
+    gdf.geometry = geoms
+    return gdf[~gdf.geometry.is_empty]
+
+
+def to_compact_geojson(gdf):
+    return gdf.to_json(drop_id=True, separators=(",", ":"), ensure_ascii=False)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(BOUNDARY_FILES) * len(SIMPLIFY_ZOOMS))
+def _load_simplified(level, zoom, mtime):
+    path = simplified_path(level, zoom)
+    if os.path.exists(path) and os.path.getmtime(path) >= mtime:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return to_compact_geojson(simplify_gdf(get_boundaries(level), zoom, coverage=True))
+
+
+def get_simplified_geojson(level, zoom_start):
+    """GeoJSON string of a DEU admin level simplified for zoom_start.
+
+    Uses the prebuilt file when it is newer than the source shapefile and
+    falls back to simplifying in-process; either way the result is cached.
+    """
+    zoom = pick_zoom(zoom_start)
+    return _load_simplified(level, zoom, os.path.getmtime(boundary_path(level)))
+
+
+def build(levels=None, zooms=SIMPLIFY_ZOOMS):
+    os.makedirs(SIMPLIFIED_DIR, exist_ok=True)
+    for level in levels or BOUNDARY_FILES:
+        gdf = get_boundaries(level)
+        for zoom in zooms:
+            path = simplified_path(level, zoom)
+            data = to_compact_geojson(simplify_gdf(gdf, zoom, coverage=True))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+            print(f"{path}: {len(data.encode('utf-8')) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Prebuild simplified GeoJSON of the DEU boundaries per zoom level"
+    )
+    parser.add_argument("--level", type=int, action="append", choices=sorted(BOUNDARY_FILES))
+    parser.add_argument("--zoom", type=int, action="append")
+    args = parser.parse_args()
+    build(args.level, tuple(args.zoom) if args.zoom else SIMPLIFY_ZOOMS)
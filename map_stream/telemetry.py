@@ -0,0 +1,214 @@
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+
+import streamlit as st
+
+from map_stream.net import serve
+
+# Prometheus text endpoint; only served when a port is configured
+METRICS_HOST = os.environ.get("MAPSTREAM_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.environ.get("MAPSTREAM_METRICS_PORT")
+# MAPSTREAM_METRICS_LOG=1 writes one JSON line per rerun to stderr
+METRICS_LOG = os.environ.get("MAPSTREAM_METRICS_LOG") == "1"
+PROFILE_TOP = 30
+
+logger = logging.getLogger("map_stream.telemetry")
+if METRICS_LOG and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+
+class Registry:
+    """Process-wide totals over all reruns, in Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reruns = 0
+        self.rerun_seconds = 0.0
+        self.stage_seconds = defaultdict(float)
+        self.stage_runs = defaultdict(int)
+        self.page_bytes = 0
+        # bytes per layer type, not per layer: layer names are unbounded
+        self.layer_bytes = defaultdict(int)
+
+    def observe(self, run):
+        with self.lock:
+            self.reruns += 1
+            self.rerun_seconds += run.elapsed()
+            for stage, seconds in run.spans.items():
+                self.stage_seconds[stage] += seconds
+                self.stage_runs[stage] += 1
+            self.page_bytes += run.page_bytes or 0
+            for kind, nbytes in run.payload.values():
+                self.layer_bytes[kind] += nbytes
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP map_stream_reruns_total Script reruns.",
+                "# TYPE map_stream_reruns_total counter",
+                f"map_stream_reruns_total {self.reruns}",
+                "# HELP map_stream_rerun_seconds_total Wall time of all reruns.",
+                "# TYPE map_stream_rerun_seconds_total counter",
+                f"map_stream_rerun_seconds_total {self.rerun_seconds:.6f}",
+                "# HELP map_stream_stage_seconds_total Wall time per rerun stage.",
+                "# TYPE map_stream_stage_seconds_total counter",
+            ]
+            lines += [
+                f'map_stream_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                for stage, seconds in sorted(self.stage_seconds.items())
+            ]
+            lines += [
+                "# HELP map_stream_stage_runs_total Reruns that went through a stage.",
+                "# TYPE map_stream_stage_runs_total counter",
+            ]
+            lines += [
+                f'map_stream_stage_runs_total{{stage="{stage}"}} {runs}'
+                for stage, runs in sorted(self.stage_runs.items())
+            ]
+            lines += [
+                "# HELP map_stream_page_bytes_total Map HTML sent to browsers.",
+                "# TYPE map_stream_page_bytes_total counter",
+                f"map_stream_page_bytes_total {self.page_bytes}",
+                "# HELP map_stream_layer_bytes_total Measured layer payload per layer type.",
+                "# TYPE map_stream_layer_bytes_total counter",
+            ]
+            lines += [
+                f'map_stream_layer_bytes_total{{kind="{kind}"}} {nbytes}'
+                for kind, nbytes in sorted(self.layer_bytes.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class RerunMetrics:
+    """Stage timings and payload sizes of one script run."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        # stage -> seconds, in the order the stages first ran
+        self.spans = {}
+        self.open = {}
+        # layer name -> (layer type, bytes)
+        self.payload = {}
+        self.page_bytes = None
+
+    def begin(self, stage):
+        self.open[stage] = time.perf_counter()
+
+    def end(self, stage):
+        elapsed = time.perf_counter() - self.open.pop(stage)
+        self.spans[stage] = self.spans.get(stage, 0.0) + elapsed
+
+    @contextmanager
+    def span(self, stage):
+        self.begin(stage)
+        try:
+            yield
+        finally:
+            self.end(stage)
+
+    def record_page(self, html):
+        self.page_bytes = len(html.encode("utf-8"))
+
+    def record_layer(self, layer):
+        name = getattr(layer, "layer_name", None) or layer.get_name()
+        # layers from the layer manager know their type and size already
+        nbytes = getattr(layer, "nbytes", None)
+        if nbytes is None:
+            nbytes = element_bytes(layer)
+        self.payload[name] = (getattr(layer, "kind", type(layer).__name__), nbytes)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            "session": self.session_id,
+            "total_s": round(self.elapsed(), 6),
+            "stages_s": {stage: round(seconds, 6) for stage, seconds in self.spans.items()},
+            "page_bytes": self.page_bytes,
+            "layer_bytes": {name: nbytes for name, (_, nbytes) in self.payload.items()},
+        }
+
+    def finish(self):
+        """Add this run to the process totals and log it."""
+        registry.observe(self)
+        logger.info(json.dumps(self.as_dict()))
+
+
+def element_bytes(element):
+    """Size of the HTML/JS a rendered folium element contributes to the page.
+
+    Renders the element's template macros again, so only call it on demand
+    and after the map itself has been rendered.
+    """
+    size = 0
+    module = element._template.module
+    for part in ("header", "html", "script"):
+        macro = getattr(module, part, None)
+        if macro is not None:
+            try:
+                size += len(macro(element, {}).encode("utf-8"))
+            except Exception:
+                pass
+    return size + sum(element_bytes(child) for child in element._children.values())
+
+
+def start_profile():
+    """Start a cProfile profiler for this rerun, or None if one is running."""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return None
+    return profile
+
+
+def profile_report(profile, top=PROFILE_TOP):
+    """Stop profile; return its top functions as text and a .prof dump.
+
+    The dump is what cProfile writes to disk, so snakeviz, flameprof or
+    gprof2dot can turn it into a flame graph.
+    """
+    profile.disable()
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    stats.sort_stats("cumulative").print_stats(top)
+    return stats.stream.getvalue(), marshal.dumps(stats.stats)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    """Serve /metrics once per process when MAPSTREAM_METRICS_PORT is set."""
+    if not METRICS_PORT:
+        return None
+    return serve(METRICS_HOST, int(METRICS_PORT), _MetricsHandler)
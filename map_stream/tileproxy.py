@@ -0,0 +1,340 @@
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import folium
+import requests
+import streamlit as st
+
+from map_stream.geocoding import TokenBucket
+from map_stream.net import CACHE_DIR, make_session, serve
+
+# Off unless MAPSTREAM_TILE_PROXY=1. When on, every basemap TileLayer points
+# at this process, which serves tiles from its disk cache and only goes to
+# the provider for tiles it doesn't have or that need revalidating.
+PROXY_ENABLED = os.environ.get("MAPSTREAM_TILE_PROXY") == "1"
+PROXY_HOST = os.environ.get("MAPSTREAM_TILE_PROXY_HOST", "127.0.0.1")
+PROXY_PORT = int(os.environ.get("MAPSTREAM_TILE_PROXY_PORT", "8766"))
+PROXY_URL = os.environ.get("MAPSTREAM_TILE_PROXY_URL", f"http://localhost:{PROXY_PORT}")
+
+TILE_CACHE_DIR = os.path.join(CACHE_DIR, "tiles")
+TILE_CACHE_LIMIT = 2 * 1024**3
+# Tiles younger than this are served without asking the provider; older
+# ones are revalidated with their ETag / Last-Modified
+TILE_TTL = 7 * 24 * 3600
+UPSTREAM_TIMEOUT = 10
+# Upstream statuses cached like tiles (e.g. seamark overlays 404 on open sea)
+CACHED_STATUS = {200, 204, 404}
+# Seeding stays well below the providers' usage limits; check their terms
+# before seeding, some (e.g. openstreetmap.org) forbid bulk downloads
+SEED_RATE = 4.0
+SEED_WORKERS = 4
+# Germany, the default area for `python -m map_stream.tileproxy seed`
+DEU_BBOX = (5.87, 47.27, 15.04, 55.06)
+
+_TILE_PATH = re.compile(r"^/([\w-]+)/(\d+)/(\d+)/(\d+)$")
+
+# provider slug -> (upstream URL template, subdomains); filled by tile_layer
+providers = {}
+
+
+def provider_slug(name):
+    return re.sub(r"[^\w]+", "-", name).strip("-").lower()
+
+
+def tile_layer(tiles, **kwargs):
+    """folium.TileLayer(tiles, **kwargs), served through the proxy when enabled.
+
+    The layer's source is registered either way, so the seeding CLI knows
+    every basemap the app uses.
+    """
+    layer = folium.TileLayer(tiles, **kwargs)
+    slug = provider_slug(layer.tile_name)
+    providers[slug] = (layer.tiles, layer.options.get("subdomains", "abc"))
+    if PROXY_ENABLED:
+        start_tile_proxy()
+        layer.tiles = f"{PROXY_URL}/{slug}/{{z}}/{{x}}/{{y}}"
+    return layer
+
+
+def upstream_url(slug, z, x, y):
+    template, subdomains = providers[slug]
+    subdomain = subdomains[(x + y) % len(subdomains)] if subdomains else ""
+    for key, value in (("{s}", subdomain), ("{z}", z), ("{x}", x), ("{y}", y), ("{r}", "")):
+        template = template.replace(key, str(value))
+    return template
+
+
+class TileCache:
+    """Tiles on disk under provider/z/x/y, each with a JSON sidecar holding
+    its status, content type, validators and fetch time.
+
+    The directory is trimmed to limit bytes by least recent use (a hit
+    touches the tile's mtime) whenever a write pushes it over.
+    """
+
+    def __init__(self, directory, limit=TILE_CACHE_LIMIT):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.size = sum(size for _, size, _ in self._files())
+
+    def _path(self, slug, z, x, y):
+        return os.path.join(self.directory, slug, str(z), str(x), str(y))
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json") or name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def get(self, slug, z, x, y):
+        """Return (body, meta) of a cached tile, or None."""
+        path = self._path(slug, z, x, y)
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(path, "rb") as f:
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return body, meta
+
+    def _write(self, path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def put(self, slug, z, x, y, body, meta):
+        path = self._path(slug, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            old = os.path.getsize(path)
+        except OSError:
+            old = 0
+        self._write(path, body)
+        self._write(f"{path}.json", json.dumps(meta).encode("utf-8"))
+        with self.lock:
+            self.size += len(body) - old
+            over = self.size > self.limit
+        if over:
+            self._trim()
+
+    def touch(self, slug, z, x, y, meta):
+        # a 304 only refreshes the sidecar
+        self._write(f"{self._path(slug, z, x, y)}.json", json.dumps(meta).encode("utf-8"))
+
+    def _trim(self):
+        with self.lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            # trim below the limit so the next writes don't trim again at once
+            target = self.limit * 0.9
+            for _, size, path in files:
+                if total <= target:
+                    break
+                for victim in (path, f"{path}.json"):
+                    try:
+                        os.remove(victim)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+            self.size = total
+
+
+_session = None
+_cache = None
+_state_lock = threading.Lock()
+# tile key -> lock, so concurrent requests for one tile fetch it once
+_fetch_locks = {}
+
+
+def _shared():
+    global _session, _cache
+    with _state_lock:
+        if _cache is None:
+            _session = make_session(len(providers) or 16, 32)
+            _cache = TileCache(TILE_CACHE_DIR)
+        return _session, _cache
+
+
+def _fresh(meta):
+    return time.time() - meta.get("fetched", 0) < TILE_TTL
+
+
+def get_tile(slug, z, x, y, bucket=None):
+    """Return (status, body, content type) of a tile, or None if unavailable.
+
+    Fresh cached tiles are served as is; stale ones are revalidated, and
+    served stale if the provider can't be reached.
+    """
+    session, cache = _shared()
+    cached = cache.get(slug, z, x, y)
+    if cached is not None and _fresh(cached[1]):
+        body, meta = cached
+        return meta["status"], body, meta["content_type"]
+
+    key = (slug, z, x, y)
+    with _state_lock:
+        lock = _fetch_locks.setdefault(key, threading.Lock())
+    with lock:
+        try:
+            # another request may have fetched it while this one waited
+            cached = cache.get(slug, z, x, y)
+            if cached is not None and _fresh(cached[1]):
+                body, meta = cached
+                return meta["status"], body, meta["content_type"]
+
+            headers = {}
+            if cached is not None:
+                if cached[1].get("etag"):
+                    headers["If-None-Match"] = cached[1]["etag"]
+                if cached[1].get("last_modified"):
+                    headers["If-Modified-Since"] = cached[1]["last_modified"]
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                response = session.get(
+                    upstream_url(slug, z, x, y), headers=headers, timeout=UPSTREAM_TIMEOUT
+                )
+            except requests.RequestException:
+                response = None
+
+            if response is not None and response.status_code == 304 and cached is not None:
+                body, meta = cached
+                meta["fetched"] = time.time()
+                cache.touch(slug, z, x, y, meta)
+                return meta["status"], body, meta["content_type"]
+            if response is None or response.status_code not in CACHED_STATUS:
+                if cached is not None:
+                    body, meta = cached
+                    return meta["status"], body, meta["content_type"]
+                return None
+
+            meta = {
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", "image/png"),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched": time.time(),
+            }
+            cache.put(slug, z, x, y, response.content, meta)
+            return meta["status"], response.content, meta["content_type"]
+        finally:
+            with _state_lock:
+                _fetch_locks.pop(key, None)
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split("?", 1)[0])
+        if match is None or match.group(1) not in providers:
+            self.send_error(404)
+            return
+        slug, z, x, y = match.group(1), *map(int, match.groups()[1:])
+        if not (0 <= x < 2**z and 0 <= y < 2**z):
+            self.send_error(404)
+            return
+        tile = get_tile(slug, z, x, y)
+        if tile is None:
+            self.send_error(502)
+            return
+        status, body, content_type = tile
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def start_tile_proxy():
+    """Start the process-wide tile proxy once and return it."""
+    return serve(PROXY_HOST, PROXY_PORT, _ProxyHandler)
+
+
+def tile_range(bbox, zoom):
+    """Inclusive (x0, x1, y0, y1) of the web-mercator tiles covering bbox."""
+    minx, miny, maxx, maxy = bbox
+    n = 2**zoom
+
+    def tile_x(lon):
+        return min(n - 1, max(0, int((lon + 180) / 360 * n)))
+
+    def tile_y(lat):
+        lat = max(-85.0511, min(85.0511, lat))
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(rad)) / math.pi) / 2 * n)))
+
+    return tile_x(minx), tile_x(maxx), tile_y(maxy), tile_y(miny)
+
+
+def seed(slug, bbox=DEU_BBOX, zooms=range(0, 11), rate=SEED_RATE, workers=SEED_WORKERS):
+    """Fill the cache with every tile of a provider covering bbox at zooms."""
+    bucket = TokenBucket(rate=rate, capacity=workers)
+    tiles = []
+    for z in zooms:
+        x0, x1, y0, y1 = tile_range(bbox, z)
+        tiles += [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+    print(f"{slug}: {len(tiles)} tiles")
+    failed = 0
+    with ThreadPoolExecutor(workers, thread_name_prefix="tile-seed") as pool:
+        for done, tile in enumerate(pool.map(lambda t: get_tile(slug, *t, bucket=bucket), tiles), 1):
+            failed += tile is None
+            if done % 500 == 0:
+                print(f"{slug}: {done}/{len(tiles)}")
+    print(f"{slug}: done, {failed} failed")
+
+
+def _register_basemaps():
+    # building the base layers registers every provider the app uses; under
+    # `python -m` basemap imports this file a second time as map_stream.tileproxy
+    from map_stream import tileproxy
+    from map_stream.basemap import add_base_layers
+
+    add_base_layers(folium.Map(tiles=None))
+    tileproxy.tile_layer("OpenStreetMap")
+    providers.update(tileproxy.providers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Basemap tile proxy cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("providers", help="list the basemap providers")
+    seed_parser = commands.add_parser("seed", help="pre-fill the cache for an area")
+    seed_parser.add_argument("provider", nargs="+")
+    seed_parser.add_argument("--bbox", type=float, nargs=4, default=DEU_BBOX, metavar=("MINX", "MINY", "MAXX", "MAXY"))
+    seed_parser.add_argument("--min-zoom", type=int, default=0)
+    seed_parser.add_argument("--max-zoom", type=int, default=10)
+    seed_parser.add_argument("--rate", type=float, default=SEED_RATE, help="tiles per second")
+    args = parser.parse_args()
+
+    _register_basemaps()
+    if args.command == "providers":
+        for slug, (url, _) in sorted(providers.items()):
+            print(f"{slug:24} {url}")
+    else:
+        for slug in args.provider:
+            if slug not in providers:
+                parser.error(f"unknown provider {slug!r}, see `providers`")
+            seed(slug, tuple(args.bbox), range(args.min_zoom, args.max_zoom + 1), args.rate)
@@ -0,0 +1,168 @@
+import functools
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+
+import numpy as np
+import shapely
+import streamlit as st
+from folium.plugins import VectorGridProtobuf
+
+from map_stream.layers import layer_key
+from map_stream.net import serve
+
+# Where the tile server listens, and the base URL the browser uses to reach
+# it (override the latter when the app runs behind a proxy).
+TILE_HOST = os.environ.get("MAPSTREAM_TILE_HOST", "127.0.0.1")
+TILE_PORT = int(os.environ.get("MAPSTREAM_TILE_PORT", "8765"))
+TILE_URL = os.environ.get("MAPSTREAM_TILE_URL", f"http://localhost:{TILE_PORT}")
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_CACHE_SIZE = 4096
+# Layers kept for the tile server; the least recently used are dropped
+# beyond this, and a session still showing one registers it again on rerun
+TILE_MAX_LAYERS = 32
+
+# half the width of the web-mercator world in metres
+_ORIGIN = 20037508.342789244
+_TILE_PATH = re.compile(r"^/tiles/([0-9a-f]+)/(\d+)/(\d+)/(\d+)\.pbf$")
+
+# layer key -> (name, EPSG:3857 geometries, STRtree, property dicts), in
+# least recently used order
+_layers = OrderedDict()
+_layers_lock = threading.Lock()
+
+
+def _property_value(value):
+    # MVT only knows strings, numbers and booleans
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def register_layer(gdf, name="layer", source=None):
+    """Make gdf available to the tile server and return its layer key.
+
+    Layers are keyed by name and source, which identifies the data (an
+    upload's digest, a boundary level; a content hash of gdf by default),
+    so registering the same data again on every rerun is cheap and keeps
+    already rendered tiles valid.
+    """
+    source = source or layer_key(gdf)
+    key = hashlib.sha1(f"{name}:{source}".encode()).hexdigest()[:16]
+    with _layers_lock:
+        if key in _layers:
+            _layers.move_to_end(key)
+            return key
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    merc = gdf.to_crs("EPSG:3857")
+    geoms = merc.geometry.values
+    props = [
+        {k: v for k, v in ((k, _property_value(v)) for k, v in row.items()) if v is not None}
+        for row in merc.drop(columns=merc.geometry.name).to_dict("records")
+    ]
+    with _layers_lock:
+        _layers[key] = (name, geoms, shapely.STRtree(geoms), props)
+        while len(_layers) > TILE_MAX_LAYERS:
+            _layers.popitem(last=False)
+    return key
+
+
+def tile_bounds(z, x, y):
+    size = 2 * _ORIGIN / 2**z
+    minx = -_ORIGIN + x * size
+    maxy = _ORIGIN - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+@functools.lru_cache(maxsize=TILE_CACHE_SIZE)
+def render_tile(key, z, x, y):
+    """Encode one z/x/y Mapbox Vector Tile of a registered layer."""
+    import mapbox_vector_tile
+
+    with _layers_lock:
+        name, geoms, tree, props = _layers[key]
+    bounds = tile_bounds(z, x, y)
+    pad = (bounds[2] - bounds[0]) * TILE_BUFFER / TILE_EXTENT
+    clip_box = (bounds[0] - pad, bounds[1] - pad, bounds[2] + pad, bounds[3] + pad)
+
+    idx = tree.query(shapely.box(*clip_box), predicate="intersects")
+    if len(idx) == 0:
+        return b""
+    idx.sort()
+    clipped = shapely.clip_by_rect(geoms[idx], *clip_box)
+    # one tile pixel at this zoom; finer detail is invisible anyway
+    clipped = shapely.simplify(clipped, (bounds[2] - bounds[0]) / TILE_EXTENT)
+    features = [
+        {"geometry": geom, "properties": props[i]}
+        for i, geom in zip(idx, clipped)
+        if not geom.is_empty
+    ]
+    return mapbox_vector_tile.encode(
+        [{"name": name, "features": features}],
+        default_options={"quantize_bounds": bounds, "extents": TILE_EXTENT},
+    )
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split("?", 1)[0])
+        if match is None:
+            self.send_error(404)
+            return
+        key, z, x, y = match.group(1), *map(int, match.groups()[1:])
+        with _layers_lock:
+            known = key in _layers
+            if known:
+                _layers.move_to_end(key)
+        if not known or not (0 <= x < 2**z and 0 <= y < 2**z):
+            self.send_error(404)
+            return
+        try:
+            body = render_tile(key, z, x, y)
+        except KeyError:
+            # dropped from the registry since the check above
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.mapbox-vector-tile")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "public, max-age=3600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@st.cache_resource(show_spinner=False)
+def start_tile_server():
+    """Start the process-wide vector tile server once and return it."""
+    return serve(TILE_HOST, TILE_PORT, _TileHandler)
+
+
+def vector_tile_layer(gdf, name="layer", style=None, source=None):
+    """Return a folium layer that loads gdf from the tile server on demand."""
+    start_tile_server()
+    key = register_layer(gdf, name, source)
+    style = style or {
+        "fill": True,
+        "weight": 1,
+        "color": "#000000",
+        "fillColor": "#3388ff",
+        "fillOpacity": 0.3,
+    }
+    options = {"vectorTileLayerStyles": {name: style}, "interactive": True}
+    return VectorGridProtobuf(f"{TILE_URL}/tiles/{key}/{{z}}/{{x}}/{{y}}.pbf", name, options)
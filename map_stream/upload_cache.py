@@ -0,0 +1,139 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from map_stream.net import CACHE_DIR
+
+UPLOAD_CACHE_DIR = os.path.join(CACHE_DIR, "uploads")
+MEMORY_LIMIT = 512 * 1024**2
+DISK_LIMIT = 4 * 1024**3
+
+# Pickles entries to the disk tier off the rerun path
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-cache")
+
+
+def upload_digest(uploaded_files, chunk_size=1 << 20):
+    """Content hash over every uploaded part (.shp/.shx/.dbf/.prj, ...)."""
+    h = hashlib.blake2b(digest_size=20)
+    for uploaded in sorted(uploaded_files, key=lambda f: f.name):
+        h.update(os.path.basename(uploaded.name).encode() + b"\0")
+        uploaded.seek(0)
+        for chunk in iter(lambda: uploaded.read(chunk_size), b""):
+            h.update(chunk)
+        uploaded.seek(0)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _entry_size(entry):
+    gdf, geojson = entry
+    return int(gdf.memory_usage(deep=True).sum()) + len(geojson)
+
+
+class UploadCache:
+    """Two-tier LRU of parsed uploads: (EPSG:4326 GeoDataFrame, GeoJSON).
+
+    Recently used entries stay in memory up to memory_limit bytes; every
+    entry is also pickled to directory in the background, and the directory
+    is trimmed to disk_limit bytes by least recent access. Several processes
+    may share the directory, so files can vanish under any of them.
+    """
+
+    def __init__(self, directory, memory_limit=MEMORY_LIMIT, disk_limit=DISK_LIMIT):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.memory = OrderedDict()
+        self.memory_size = 0
+        # digest -> entry queued for the disk but not written yet
+        self.pending = {}
+        self.lock = threading.Lock()
+        # serializes the trims of this process
+        self.disk_lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def _remember(self, digest, entry):
+        size = _entry_size(entry)
+        if size > self.memory_limit:
+            return
+        if digest in self.memory:
+            self.memory_size -= self.memory.pop(digest)[1]
+        self.memory[digest] = (entry, size)
+        self.memory_size += size
+        while self.memory_size > self.memory_limit:
+            self.memory_size -= self.memory.popitem(last=False)[1][1]
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _write(self, digest, entry):
+        path = self._path(digest)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            with self.disk_lock:
+                self._trim_disk()
+        finally:
+            with self.lock:
+                if self.pending.get(digest) is entry:
+                    del self.pending[digest]
+
+    def get(self, digest):
+        with self.lock:
+            if digest in self.memory:
+                self.memory.move_to_end(digest)
+                return self.memory[digest][0]
+            if digest in self.pending:
+                return self.pending[digest]
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            # mtime doubles as the access time for disk LRU
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        with self.lock:
+            self._remember(digest, entry)
+        return entry
+
+    def put(self, digest, gdf, geojson):
+        entry = (gdf, geojson)
+        with self.lock:
+            self._remember(digest, entry)
+            self.pending[digest] = entry
+        _executor.submit(self._write, digest, entry)
+        return entry
+
+
+@st.cache_resource(show_spinner=False)
+def get_upload_cache():
+    return UploadCache(UPLOAD_CACHE_DIR)
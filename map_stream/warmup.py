@@ -0,0 +1,41 @@
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from map_stream.basemap import ZOOM_START
+from map_stream.boundaries import get_boundaries
+from map_stream.gazetteer import get_gazetteer
+from map_stream.simplify import get_simplified_geojson
+
+# Imported by map_stream.app only once a session uses the feature
+DEFERRED_MODULES = (
+    "streamlit_folium",
+    "map_stream.heatmap",
+    "map_stream.ingest",
+    "map_stream.query",
+    "map_stream.search",
+    "map_stream.tiles",
+    "map_stream.upload_cache",
+    "map_stream.workers",
+)
+# Boundary levels behind the DEU buttons
+WARMUP_LEVELS = (2, 3)
+WARMUP_WORKERS = 4
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up():
+    """Start filling the process-wide caches, once per server process.
+
+    Returns immediately; the work runs on a small thread pool while the
+    first session renders. Failures are left to the code path that needs
+    the data, which will raise them again.
+    """
+    executor = ThreadPoolExecutor(WARMUP_WORKERS, thread_name_prefix="warm-up")
+    futures = [executor.submit(get_boundaries, level) for level in WARMUP_LEVELS]
+    futures += [executor.submit(get_simplified_geojson, level, ZOOM_START) for level in WARMUP_LEVELS]
+    futures.append(executor.submit(get_gazetteer))
+    futures += [executor.submit(importlib.import_module, name) for name in DEFERRED_MODULES]
+    executor.shutdown(wait=False)
+    return futures
@@ -0,0 +1,255 @@
+import functools
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import geopandas as gpd
+import pandas as pd
+import streamlit as st
+
+from map_stream.ingest import HAS_ARROW, SEEKABLE_SUFFIXES, SHARD_ROWS, iter_batches, prepare_batch, read_shard
+from map_stream.simplify import to_compact_geojson
+
+# Processes that reproject, repair, simplify and serialize uploads, shared by
+# every session of the server; MAPSTREAM_GEOMETRY_WORKERS=0 reads them inline
+GEOMETRY_WORKERS = int(os.environ.get("MAPSTREAM_GEOMETRY_WORKERS", os.cpu_count() or 1))
+# Below this many features a worker round trip costs more than it saves
+INLINE_MAX_FEATURES = 20_000
+# The same for datasets that aren't counted up front (GeoJSON, ~1 kB a
+# feature)
+INLINE_MAX_BYTES = 20 << 20
+# Seconds a finished job waits to be collected before it and its result are
+# dropped, e.g. when its session left or cleared the upload
+JOB_TTL = 600
+
+# What to_compact_geojson puts around the features, so the GeoJSON of every
+# shard can be joined without parsing it again
+_FEATURES_PREFIX = '{"type":"FeatureCollection","features":['
+_FEATURES_SUFFIX = "]}"
+
+if HAS_ARROW:
+    import pyarrow as pa
+
+
+def to_ipc(gdf):
+    """Arrow IPC stream of gdf with WKB geometries."""
+    table = pa.table(gdf.to_arrow(index=False, geometry_encoding="WKB"))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_ipc(data):
+    return gpd.GeoDataFrame.from_arrow(pa.ipc.open_stream(data).read_all())
+
+
+def worth_offloading(shards):
+    """Whether the shards of plan_shards are large enough for the workers."""
+    rows = sum(count or 0 for _, _, count in shards)
+    streamed = sum(os.path.getsize(path) for path, _, count in shards if count is None)
+    return rows > INLINE_MAX_FEATURES or streamed > INLINE_MAX_BYTES
+
+
+def _encode(gdf):
+    # the returned frame travels back as one Arrow buffer instead of being
+    # pickled geometry by geometry
+    features = to_compact_geojson(gdf)[len(_FEATURES_PREFIX) : -len(_FEATURES_SUFFIX)]
+    return (to_ipc(gdf) if HAS_ARROW else gdf), features
+
+
+def _process_shard(path, start, count):
+    # runs in a worker process
+    return _encode(read_shard(path, start, count))
+
+
+def _process_batch(batch):
+    # runs in a worker process, on a batch read by the service's reader
+    return _encode(prepare_batch(from_ipc(batch) if isinstance(batch, bytes) else batch))
+
+
+class GeometryJob:
+    """The parts of one upload on the worker pool.
+
+    Parts are added while the upload is read and the job is closed once
+    every part has been submitted (or reading failed). directory holds the
+    uploaded files and is removed once the job is closed and every part has
+    finished, whether or not anyone collects the result; on_finish(job) is
+    called then too.
+    """
+
+    def __init__(self, directory=None, on_finish=None):
+        self.futures = []
+        self.directory = directory
+        self.on_finish = on_finish
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        # the open job counts as one pending part until it is closed
+        self.pending = 1
+        self.reading = True
+        self.error = None
+        self.finished = threading.Event()
+        self.collected = False
+        self.outcome = None
+
+    def add(self, future):
+        with self.lock:
+            self.futures.append(future)
+            self.pending += 1
+        future.add_done_callback(self._release)
+
+    def close(self, error=None):
+        """No more parts follow; error is raised by result() if given."""
+        self.error = error
+        self.reading = False
+        self._release()
+
+    def _release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+            finished = self.pending == 0
+        if not finished:
+            return
+        self.finished.set()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        if self.on_finish:
+            self.on_finish(self)
+
+    def done(self):
+        return self.finished.is_set()
+
+    def progress(self):
+        """(parts done, parts submitted so far); see reading."""
+        futures = list(self.futures)
+        return sum(future.done() for future in futures), len(futures)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def result(self):
+        """(EPSG:4326 GeoDataFrame, GeoJSON) of the upload, None if it is empty.
+
+        Waits for every part and raises the error of the reader or of the
+        first failed part.
+        """
+        self.finished.wait()
+        with self.lock:
+            if not self.collected:
+                if self.error is not None:
+                    raise self.error
+                parts = [future.result() for future in self.futures]
+                frames = [from_ipc(frame) if isinstance(frame, bytes) else frame for frame, _ in parts]
+                gdf = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs="EPSG:4326") if frames else None
+                features = ",".join(features for _, features in parts if features)
+                if gdf is not None and len(gdf):
+                    self.outcome = (gdf, _FEATURES_PREFIX + features + _FEATURES_SUFFIX)
+                self.collected = True
+            return self.outcome
+
+
+class GeometryService:
+    """A process pool and the jobs running on it, by key.
+
+    Sessions that submit the same key (the same upload) share one job. A
+    finished job is forgotten JOB_TTL seconds later if no session has
+    collected it by then.
+    """
+
+    def __init__(self, workers=GEOMETRY_WORKERS):
+        self.workers = workers
+        self.pool = self._new_pool()
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def _new_pool(self):
+        # spawn: forking the multi-threaded Streamlit server is not safe
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _submit(self, fn, *args):
+        with self.lock:
+            try:
+                return self.pool.submit(fn, *args)
+            except BrokenProcessPool:
+                # a worker died (out of memory, killed); start over with a new pool
+                self.pool = self._new_pool()
+                return self.pool.submit(fn, *args)
+
+    def submit(self, key, shards, directory=None):
+        """Start reading shards, (path, start, count) from plan_shards, as key.
+
+        Shards of seekable datasets are read by the workers themselves. Any
+        other dataset is read once, batch by batch, on a reader thread that
+        hands the batches to the workers.
+        """
+        with self.lock:
+            if key in self.jobs:
+                if directory:
+                    shutil.rmtree(directory, ignore_errors=True)
+                return self.jobs[key]
+            job = self.jobs[key] = GeometryJob(directory, functools.partial(self._finished, key))
+        streamed = []
+        try:
+            for path, start, count in shards:
+                if count is None and not path.lower().endswith(SEEKABLE_SUFFIXES):
+                    streamed.append(path)
+                else:
+                    job.add(self._submit(_process_shard, path, start, count))
+        except Exception as e:
+            job.close(e)
+            return job
+        if streamed:
+            threading.Thread(target=self._stream, args=(job, streamed), name="geometry-reader", daemon=True).start()
+        else:
+            job.close()
+        return job
+
+    def _stream(self, job, paths):
+        # at most two batches per worker are read ahead, so a slow pool holds
+        # back the reader instead of the whole upload piling up in memory
+        slots = threading.Semaphore(2 * self.workers)
+        error = None
+        try:
+            os.environ["SHAPE_RESTORE_SHX"] = "YES"
+            for path in paths:
+                for batch in iter_batches(path, SHARD_ROWS):
+                    slots.acquire()
+                    future = self._submit(_process_batch, to_ipc(batch) if HAS_ARROW else batch)
+                    future.add_done_callback(lambda _: slots.release())
+                    job.add(future)
+        except Exception as e:
+            error = e
+        finally:
+            job.close(error)
+
+    def _finished(self, key, job):
+        # a weak reference, so a job collected meanwhile isn't kept alive
+        timer = threading.Timer(JOB_TTL, self._expire, (key, weakref.ref(job)))
+        timer.daemon = True
+        timer.start()
+
+    def _expire(self, key, job_ref):
+        job = job_ref()
+        if job is not None:
+            self.forget(key, job)
+
+    def get(self, key):
+        with self.lock:
+            return self.jobs.get(key)
+
+    def forget(self, key, job=None):
+        """Drop the job of key (only if it is still job, when given)."""
+        with self.lock:
+            if job is None or self.jobs.get(key) is job:
+                self.jobs.pop(key, None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_geometry_service():
+    """The server's geometry workers, or None when they are disabled."""
+    return GeometryService() if GEOMETRY_WORKERS > 0 else None
@@ -0,0 +1,15 @@
+import os
+
+from map_stream import boundaries
+
+
+def test_boundary_source_follows_the_file(monkeypatch, tmp_path):
+    path = tmp_path / "DEU_adm2.shp"
+    path.write_bytes(b"")
+    monkeypatch.setattr(boundaries, "source_path", lambda level: str(path))
+    os.utime(path, (1_000, 1_000))
+    before = boundaries.boundary_source(2)
+    assert before == boundaries.boundary_source(2)
+    # replaced on disk
+    os.utime(path, (2_000, 2_000))
+    assert boundaries.boundary_source(2) != before
@@ -0,0 +1,14 @@
+from map_stream import export
+
+
+def test_prune_forgets_removed_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(export, "EXPORT_MAX_FILES", 2)
+    monkeypatch.setattr(export, "_written", {})
+    monkeypatch.setattr(export, "_path_locks", {})
+    paths = [export.session_export_path(f"session-{i}") for i in range(4)]
+    for i, path in enumerate(paths):
+        export.export_html(f"<p>{i}</p>", path).result()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["session-2.html", "session-3.html"]
+    assert sorted(export._written) == sorted(paths[2:])
+    assert sorted(export._path_locks) == sorted(paths[2:])
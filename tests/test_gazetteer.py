@@ -0,0 +1,79 @@
+import geopandas as gpd
+import pytest
+import shapely
+
+from map_stream import search
+from map_stream.gazetteer import get_gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return get_gazetteer()
+
+
+def resolved_name(gazetteer, name, approximate=False):
+    match = gazetteer.resolve(name, approximate)
+    if match is None:
+        return None
+    level, pos = match
+    return gazetteer.frames[level].iloc[pos][f"NAME_{level}"]
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [("Bayern", "Bayern"), ("  bayern ", "Bayern"), ("Deutschland", "Germany"), ("Bavaria", "Bayern")],
+)
+def test_exact(gazetteer, name, expected):
+    assert resolved_name(gazetteer, name) == expected
+
+
+@pytest.mark.parametrize("name", ["Köln", "Koeln", "Koln", "KÖLN"])
+def test_umlauts(gazetteer, name):
+    assert resolved_name(gazetteer, name) == "Köln"
+
+
+def test_prefix_only_when_approximate(gazetteer):
+    assert resolved_name(gazetteer, "Frankfurt am M") is None
+    assert resolved_name(gazetteer, "Frankfurt am M", approximate=True) == "Frankfurt am Main Städte"
+
+
+@pytest.mark.parametrize("name", ["Bern", "Frankfurt", "Paris"])
+def test_foreign_names_miss(gazetteer, name):
+    # prefixes or trigram neighbours of DEU names, but not the places meant
+    assert gazetteer.resolve(name) is None
+
+
+def test_unknown(gazetteer):
+    assert gazetteer.resolve("xyzzy", approximate=True) is None
+
+
+def _remote(known):
+    def remote_place(name):
+        if name not in known:
+            return None
+        return gpd.GeoDataFrame(geometry=[shapely.Point(known[name])], crs="EPSG:4326")
+
+    return remote_place
+
+
+def test_search_asks_nominatim_before_approximate(monkeypatch):
+    monkeypatch.setattr(search, "_remote_place", _remote({"Bern": (7.45, 46.95)}))
+    found, missing = search.search_places(["Bern", "Bayern"])
+    assert missing == []
+    assert list(found["query"]) == ["Bern", "Bayern"]
+    assert found.geometry.iloc[0].equals(shapely.Point(7.45, 46.95))
+
+
+def test_search_falls_back_to_approximate(monkeypatch):
+    monkeypatch.setattr(search, "_remote_place", _remote({}))
+    found, missing = search.search_places(["Frankfurt am M", "xyzzy"])
+    assert missing == ["xyzzy"]
+    assert list(found["query"]) == ["Frankfurt am M"]
+
+
+def test_search_reports_names_past_the_limit(monkeypatch):
+    monkeypatch.setattr(search, "MAX_PLACES", 2)
+    monkeypatch.setattr(search, "_remote_place", _remote({}))
+    found, missing = search.search_places(["Bayern", "Köln", "Hessen", "Sachsen"])
+    assert list(found["query"]) == ["Bayern", "Köln"]
+    assert missing == ["Hessen", "Sachsen"]
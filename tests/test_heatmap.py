@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_stream.heatmap import HEATMAP_MAX_CELLS, heatmap_layer
+
+
+def _points(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Latitude": rng.uniform(47.3, 55.0, rows),
+            "Longitude": rng.uniform(5.9, 15.0, rows),
+            "Population": rng.integers(1, 1_000, rows),
+        }
+    )
+
+
+def _bands(layer):
+    return [child for child in layer._children.values() if hasattr(child, "data")]
+
+
+@pytest.mark.parametrize("method", ["grid", "hex"])
+def test_large_frame_is_aggregated(method):
+    df = _points(200_000)
+    bands = _bands(heatmap_layer(df, weight="Population", method=method))
+    sent = sum(len(band.data) for band in bands)
+    assert sent < len(df)
+    assert sent <= HEATMAP_MAX_CELLS
+    # each binning sent still aggregates
+    assert all(len(band.data) <= len(df) / 2 for band in bands)
+
+
+def test_small_frame_ends_with_raw_points():
+    df = _points(50)
+    bands = _bands(heatmap_layer(df, weight="Population"))
+    assert len(bands) == 2
+    assert sorted(map(tuple, bands[-1].data)) == sorted(
+        map(tuple, df[["Latitude", "Longitude", "Population"]].astype(float).to_numpy().tolist())
+    )
@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_has_no_side_effects(tmp_path):
+    cache_dir = tmp_path / "cache"
+    subprocess.run(
+        [sys.executable, "-c", "import map_stream.app, map_stream.bulk, map_stream.search"],
+        cwd=ROOT,
+        env={**os.environ, "MAPSTREAM_CACHE_DIR": str(cache_dir)},
+        check=True,
+        capture_output=True,
+    )
+    assert not cache_dir.exists()
@@ -0,0 +1,45 @@
+import geopandas as gpd
+import pytest
+import shapely
+
+from map_stream.layers import LayerStore
+
+BOUNDS = (5.0, 47.0, 15.0, 55.0)
+
+
+@pytest.fixture
+def store():
+    store = LayerStore()
+    store.add(
+        "points",
+        gpd.GeoDataFrame({"name": ["a", "b"]}, geometry=[shapely.Point(8, 50), shapely.Point(13, 52)], crs="EPSG:4326"),
+    )
+    store.add(
+        "lines",
+        gpd.GeoDataFrame(
+            {"name": ["river"]},
+            geometry=[shapely.LineString([(6, 48), (7, 49.0001), (8, 50), (30, 60)])],
+            crs="EPSG:4326",
+        ),
+    )
+    return store
+
+
+@pytest.mark.parametrize("zoom", [None, 4, 12])
+def test_query_points(store, zoom):
+    view = store.query("points", BOUNDS, zoom)
+    assert list(view["name"]) == ["a", "b"]
+    assert (view.geom_type == "Point").all()
+
+
+@pytest.mark.parametrize("zoom", [None, 4, 12])
+def test_query_lines(store, zoom):
+    view = store.query("lines", BOUNDS, zoom)
+    assert list(view["name"]) == ["river"]
+    assert view.geom_type.iloc[0] == "LineString"
+    # clipped to the buffered view
+    assert view.total_bounds[2] <= BOUNDS[2] + (BOUNDS[2] - BOUNDS[0]) * 0.25
+
+
+def test_query_outside_view(store):
+    assert store.query("points", (-10.0, -10.0, -5.0, -5.0), 8).empty
@@ -0,0 +1,32 @@
+import geopandas as gpd
+import shapely
+
+from map_stream import tiles
+
+
+def _gdf():
+    return gpd.GeoDataFrame({"name": ["a"]}, geometry=[shapely.Point(8, 50)], crs="EPSG:4326")
+
+
+def test_registry_is_bounded(monkeypatch):
+    monkeypatch.setattr(tiles, "_layers", type(tiles._layers)())
+    monkeypatch.setattr(tiles, "TILE_MAX_LAYERS", 2)
+    first = tiles.register_layer(_gdf(), "upload", source="a")
+    second = tiles.register_layer(_gdf(), "upload", source="b")
+    # used again, so "b" is the least recently used
+    assert tiles.register_layer(_gdf(), "upload", source="a") == first
+    third = tiles.register_layer(_gdf(), "upload", source="c")
+    assert list(tiles._layers) == [first, third]
+    assert second not in tiles._layers
+
+
+def test_known_source_is_not_hashed(monkeypatch):
+    monkeypatch.setattr(tiles, "_layers", type(tiles._layers)())
+
+    def layer_key(gdf):
+        raise AssertionError("hashed the frame")
+
+    monkeypatch.setattr(tiles, "layer_key", layer_key)
+    key = tiles.register_layer(_gdf(), "DEU_adm2", source="boundaries")
+    assert tiles.register_layer(_gdf(), "DEU_adm2", source="boundaries") == key
+    assert tiles.register_layer(_gdf(), "DEU_adm3", source="boundaries") != key
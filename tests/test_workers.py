@@ -0,0 +1,34 @@
+import geopandas as gpd
+import shapely
+
+from map_stream.ingest import plan_shards
+from map_stream.workers import GeometryService
+
+
+def _write(directory, rows, driver, suffix):
+    gdf = gpd.GeoDataFrame(
+        {"id": range(rows)}, geometry=[shapely.Point(8 + i / rows, 50) for i in range(rows)], crs="EPSG:4326"
+    )
+    path = str(directory / f"upload{suffix}")
+    gdf.to_file(path, driver=driver)
+    return path
+
+
+def test_only_shapefiles_are_split(tmp_path):
+    shp = _write(tmp_path, 25, "ESRI Shapefile", ".shp")
+    geojson = _write(tmp_path, 25, "GeoJSON", ".geojson")
+    assert plan_shards([shp], shard_rows=10) == [(shp, 0, 10), (shp, 10, 10), (shp, 20, 5)]
+    assert plan_shards([geojson], shard_rows=10) == [(geojson, 0, None)]
+
+
+def test_geojson_is_streamed_to_the_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr("map_stream.workers.SHARD_ROWS", 10)
+    geojson = _write(tmp_path, 25, "GeoJSON", ".geojson")
+    service = GeometryService(workers=1)
+    try:
+        job = service.submit("upload", plan_shards([geojson]))
+        gdf, _ = job.result()
+    finally:
+        service.pool.shutdown()
+    assert job.progress() == (3, 3)
+    assert sorted(gdf["id"]) == list(range(25))